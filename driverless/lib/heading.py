@@ -0,0 +1,100 @@
+import threading
+import time
+import numpy
+
+# ============================================================================
+# Widest-clearance heading planner
+# ============================================================================
+
+def _wrap(angle):
+    """Angle difference in degrees folded into -180..180."""
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+class HeadingPlanner:
+    """Picks the turn towards the widest clear heading from recent sonar bearings.
+
+    Headings are in degrees, positive to the left. observe() stores a
+    reading in world heading (car heading + bearing), keeping only the
+    latest one per bin_width wide heading bin, so a fast stream of readings
+    straight ahead cannot push out what was seen in other directions;
+    plan() scores every
+    candidate turn at once on clearance, turn size and how recently the
+    car was sent that way, and records the winner as visited.
+    turn_command() turns the angle into one timed set_motor_model command.
+    """
+
+    def __init__(self, turn_duty: int = 1000, turn_rate: float = 90.0, offsets=range(-180, 180, 15),
+                 half_width: float = 20.0, cap: float = 150.0, unknown: float = 60.0, max_age: float = 10.0,
+                 turn_weight: float = 0.3, visit_weight: float = 0.3, visit_tau: float = 20.0,
+                 bin_width: float = 15.0, visits: int = 16):
+        self.turn_duty = turn_duty          # |duty| of the wheels while turning in place
+        self.turn_rate = turn_rate          # deg/s reached with turn_duty, measure it on your car
+        self.offsets = numpy.asarray(list(offsets), dtype=numpy.float64)
+        self.half_width = half_width        # deg, a reading counts for candidates this close to it
+        self.cap = cap                      # cm, more clearance than this scores the same
+        self.unknown = unknown              # cm assumed for headings without a fresh reading
+        self.max_age = max_age              # s
+        self.turn_weight = turn_weight
+        self.visit_weight = visit_weight
+        self.visit_tau = visit_tau          # s
+        self.heading = 0.0                  # Open-loop heading when the caller does not track one
+        self.bin_width = bin_width          # deg
+        self._obs = numpy.zeros(int(numpy.ceil(360.0 / bin_width)), dtype=[('heading', 'f8'), ('distance', 'f8'), ('t', 'f8')])
+        self._obs['t'] = -numpy.inf
+        self._visits = numpy.zeros(visits, dtype=[('heading', 'f8'), ('t', 'f8')])
+        self._visits['t'] = -numpy.inf
+        self._n_visits = 0
+        self._lock = threading.Lock()
+
+    def observe(self, bearing: float, distance: float, heading: float = None, now: float = None) -> None:
+        """Store a reading taken bearing degrees off the car heading (None or NaN distances are dropped)."""
+        if distance is None or numpy.isnan(distance):
+            return
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            if heading is None:
+                heading = self.heading
+            world = float(_wrap(heading + bearing))
+            self._obs[int((world + 180.0) // self.bin_width) % len(self._obs)] = (world, distance, now)
+
+    def scores(self, heading: float = None, now: float = None) -> numpy.ndarray:
+        """Score of every offset in self.offsets, higher is better."""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            if heading is None:
+                heading = self.heading
+            candidates = heading + self.offsets
+            obs = self._obs[(now - self._obs['t']) <= self.max_age]
+            near = numpy.abs(_wrap(candidates[:, None] - obs['heading'][None, :])) <= self.half_width
+            clearance = numpy.where(near, obs['distance'][None, :], numpy.inf).min(axis=1, initial=numpy.inf)
+            clearance[numpy.isinf(clearance)] = self.unknown
+            visits = self._visits
+            recent = numpy.exp(-(now - visits['t']) / self.visit_tau)
+            visited = numpy.abs(_wrap(candidates[:, None] - visits['heading'][None, :])) <= self.half_width
+            penalty = (visited * recent[None, :]).sum(axis=1)
+        return (numpy.minimum(clearance, self.cap) / self.cap
+                - self.turn_weight * numpy.abs(self.offsets) / 180.0
+                - self.visit_weight * penalty)
+
+    def plan(self, heading: float = None, now: float = None, min_turn: float = 0.0) -> float:
+        """Best turn in degrees (positive = left) at least min_turn wide, recorded as visited."""
+        if now is None:
+            now = time.monotonic()
+        scores = self.scores(heading, now)
+        scores[numpy.abs(self.offsets) < min_turn] = -numpy.inf
+        angle = float(self.offsets[int(numpy.argmax(scores))])
+        with self._lock:
+            if heading is None:
+                heading = self.heading
+            self.heading = float(_wrap(heading + angle))
+            self._visits[self._n_visits % len(self._visits)] = (self.heading, now)
+            self._n_visits += 1
+        return angle
+
+    def turn_command(self, angle: float) -> tuple:
+        """((duty1, duty2, duty3, duty4), seconds) turning in place by angle degrees."""
+        d = self.turn_duty if angle > 0 else -self.turn_duty
+        return (-d, -d, d, d), abs(angle) / self.turn_rate
@@ -0,0 +1,110 @@
+import os
+import threading
+import numpy
+
+# ============================================================================
+# Double-buffered LED frame transmitter
+# ============================================================================
+
+class FrameTransmitter:
+    """Mixin that sends LED frames from a background thread.
+
+    The strip class keeps drawing into led_color (an (N, 3) uint8 array)
+    and bumps led_version on every change; it implements
+    write_frame(color, mode), which encodes and sends one frame. After
+    enable_async(), present() copies led_color into the waiting buffer and
+    returns at once; the transmitter swaps the waiting and sending buffers
+    and writes outside the lock. A frame presented before the previous one
+    was taken replaces it, so at most one frame is ever queued.
+    """
+    DEFAULT_MODE = None    # Mode of show() and present() when none is given, strips with modes override it
+
+    def init_transmitter(self) -> None:
+        """Call from __init__ before the first show()."""
+        self.frames_dropped = 0        # Presented frames replaced before the transmitter took them
+        self.led_async = False
+        self.tx_thread = None
+        self.tx_pid = None
+
+    def enable_async(self) -> None:
+        """Make show() present frames to the transmitter instead of sending them itself."""
+        self.led_async = True
+
+    def _transmitter_here(self) -> bool:
+        # A forked child does not inherit the thread of its parent
+        return self.tx_thread is not None and self.tx_pid == os.getpid()
+
+    def start_transmitter(self) -> None:
+        """(Re)start the transmitter thread in this process."""
+        self.tx_cond = threading.Condition()
+        self.tx_front = numpy.zeros_like(self.led_color)     # Presented frame waiting for the transmitter
+        self.tx_back = numpy.zeros_like(self.led_color)      # Frame the transmitter is sending
+        self.tx_waiting = False
+        self.tx_mode = None
+        self.tx_busy = False
+        self.tx_closing = False
+        self.tx_pid = os.getpid()
+        self.tx_thread = threading.Thread(target=self.transmit_frames, name="led_transmitter", daemon=True)
+        self.tx_thread.start()
+
+    def present(self, mode=None, force: bool = False) -> None:
+        """Hand the current frame to the transmitter and return at once.
+
+        Frames already sent are skipped like in show(), unless force is set.
+        """
+        if mode is None:
+            mode = self.DEFAULT_MODE
+        version = (self.led_version, mode)
+        if not force and version == self.led_sent_version:
+            self.frames_skipped += 1
+            return
+        if not self._transmitter_here():
+            self.start_transmitter()
+        with self.tx_cond:
+            if self.tx_front.shape != self.led_color.shape:
+                self.tx_front = numpy.zeros_like(self.led_color)
+            if self.tx_waiting:
+                self.frames_dropped += 1
+            numpy.copyto(self.tx_front, self.led_color)
+            self.tx_waiting = True
+            self.tx_mode = mode
+            self.tx_cond.notify_all()
+        self.led_sent_version = version
+
+    def transmit_frames(self) -> None:
+        """Transmitter loop: swap in the waiting frame and send it outside the lock."""
+        while True:
+            with self.tx_cond:
+                self.tx_cond.wait_for(lambda: self.tx_waiting or self.tx_closing)
+                if not self.tx_waiting:
+                    break
+                self.tx_front, self.tx_back = self.tx_back, self.tx_front
+                self.tx_waiting = False
+                self.tx_busy = True
+                mode = self.tx_mode
+            try:
+                self.write_frame(self.tx_back, mode)
+            except OSError as e:
+                print(f"LED transmitter: {e}")
+            finally:
+                with self.tx_cond:
+                    self.tx_busy = False
+                    self.frames_sent += 1
+                    self.tx_cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every presented frame is on the strip, False on timeout."""
+        if not self._transmitter_here():
+            return True
+        with self.tx_cond:
+            return self.tx_cond.wait_for(lambda: not self.tx_waiting and not self.tx_busy, timeout)
+
+    def stop_transmitter(self) -> None:
+        """Send what is waiting, then end the transmitter thread."""
+        if not self._transmitter_here():
+            return
+        with self.tx_cond:
+            self.tx_closing = True
+            self.tx_cond.notify_all()
+        self.tx_thread.join()
+        self.tx_thread = None
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import namedtuple
+
+# ============================================================================
+# Preemptible maneuver scheduler
+# ============================================================================
+
+# duties: (d1, d2, d3, d4) wheel targets or None to keep them, buzzer: state or pattern for apply(),
+# preemptible: whether a newer maneuver of the same priority may replace this step
+Step = namedtuple('Step', ['name', 'duties', 'duration', 'buzzer', 'preemptible'], defaults=(None, True))
+
+
+class Maneuver:
+    """A named timeline of steps, each one held for its duration."""
+
+    def __init__(self, name: str, steps: list, priority: int = 0):
+        self.name = name
+        self.steps = list(steps)
+        self.priority = priority
+
+    def duration(self) -> float:
+        return sum(step.duration for step in self.steps)
+
+
+class ManeuverEngine:
+    """Runs one maneuver at a time against the monotonic clock without blocking.
+
+    tick() is called from the control loop every period, it applies a step
+    through the apply(step) callback the moment it starts. start() replaces
+    the running maneuver when the new one has a higher priority, or the same
+    priority while the current step is preemptible.
+    """
+
+    def __init__(self, apply):
+        self.apply = apply
+        self.preemptions = 0
+        self._maneuver = None
+        self._index = 0
+        self._step_end = 0.0
+        self._lock = threading.RLock()
+
+    @property
+    def active(self) -> Maneuver:
+        return self._maneuver
+
+    def current_step(self) -> Step:
+        with self._lock:
+            if self._maneuver is None:
+                return None
+            return self._maneuver.steps[self._index]
+
+    def can_start(self, priority: int) -> bool:
+        """Whether a maneuver of this priority would be accepted right now."""
+        with self._lock:
+            if self._maneuver is None:
+                return True
+            if priority != self._maneuver.priority:
+                return priority > self._maneuver.priority
+            return self._maneuver.steps[self._index].preemptible
+
+    def start(self, maneuver: Maneuver, now: float = None) -> bool:
+        """Start maneuver (preempting the current one if allowed), False if rejected."""
+        with self._lock:
+            if not self.can_start(maneuver.priority):
+                return False
+            if self._maneuver is not None:
+                self.preemptions += 1
+            self._maneuver = maneuver
+            self._enter(0, time.monotonic() if now is None else now)
+            return True
+
+    def amend(self, steps: list, now: float = None) -> bool:
+        """Replace the steps after the current one, False when nothing is running."""
+        with self._lock:
+            if self._maneuver is None:
+                return False
+            self._maneuver.steps[self._index + 1:] = list(steps)
+            self.tick(now)
+            return True
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._maneuver = None
+
+    def _enter(self, index: int, start: float) -> None:
+        steps = self._maneuver.steps
+        while index < len(steps):
+            step = steps[index]
+            self._index = index
+            self._step_end = start + step.duration
+            self.apply(step)
+            if step.duration > 0:
+                return
+            index += 1
+        self._maneuver = None
+
+    def tick(self, now: float = None) -> Step:
+        """Advance the timeline, returns the step in effect (None when idle)."""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            while self._maneuver is not None and now >= self._step_end:
+                # Next step starts when the previous one was due, not when we noticed
+                self._enter(self._index + 1, self._step_end)
+            return self.current_step()
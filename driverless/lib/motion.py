@@ -0,0 +1,112 @@
+import threading
+import time
+
+# ============================================================================
+# Fixed-rate wheel controller with slew-rate limiting
+# ============================================================================
+
+class MotionController:
+    """Moves the four wheel duties of an Ordinary_Car towards their targets.
+
+    A background thread ticks at a fixed rate and changes each duty by at
+    most max_accel (|duty| growing) or max_decel (|duty| shrinking) duty
+    units per second, which gives trapezoidal duty profiles and makes a
+    reversal pass through zero instead of jumping. Frames are only sent to
+    the car when a duty actually changes.
+    """
+
+    def __init__(self, car, rate: float = 100.0, max_accel=10000.0, max_decel=20000.0):
+        self.car = car
+        self.period = 1.0 / rate
+        self.max_accel = self._per_wheel(max_accel)    # duty/s, scalar or one value per wheel
+        self.max_decel = self._per_wheel(max_decel)
+        self.frames_sent = 0
+        self._target = [0.0, 0.0, 0.0, 0.0]
+        self._duty = [0.0, 0.0, 0.0, 0.0]
+        self._sent = None
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _per_wheel(value) -> list:
+        if isinstance(value, (int, float)):
+            return [float(value)] * 4
+        if len(value) != 4:
+            raise ValueError(f"Expected one limit per wheel, got {len(value)} values.")
+        return [float(v) for v in value]
+
+    def start(self) -> None:
+        """Start the control thread."""
+        if self._thread is None:
+            self._running.set()
+            self._thread = threading.Thread(target=self._run, name="motion", daemon=True)
+            self._thread.start()
+
+    def set_target(self, duty1, duty2, duty3, duty4) -> None:
+        """New target duties, reached at the configured slew rates."""
+        with self._lock:
+            self._target = [float(duty1), float(duty2), float(duty3), float(duty4)]
+
+    def get_duty(self) -> tuple:
+        """Duties currently applied to the wheels."""
+        with self._lock:
+            return tuple(self._duty)
+
+    def at_target(self) -> bool:
+        with self._lock:
+            return self._duty == self._target
+
+    def stop(self, immediate: bool = False) -> None:
+        """Ramp down to zero, or with immediate brake right now through one block write of the wheel channels."""
+        with self._lock:
+            self._target = [0.0, 0.0, 0.0, 0.0]
+            if immediate:
+                self._duty = [0.0, 0.0, 0.0, 0.0]
+                self._sent = (0, 0, 0, 0)
+                self.car.emergency_brake()
+
+    def tick(self, dt: float) -> bool:
+        """Advance the profiles by dt seconds, True when a frame was sent."""
+        with self._lock:
+            for i in range(4):
+                duty, target = self._duty[i], self._target[i]
+                if duty == target:
+                    continue
+                if duty != 0 and (target * duty < 0 or abs(target) < abs(duty)):
+                    # Slowing down (or reversing: slow down to zero first)
+                    goal = target if target * duty > 0 else 0.0
+                    step = self.max_decel[i] * dt
+                else:
+                    goal = target
+                    step = self.max_accel[i] * dt
+                if abs(goal - duty) <= step:
+                    duty = goal
+                else:
+                    duty += step if goal > duty else -step
+                self._duty[i] = duty
+            frame = tuple(int(round(duty)) for duty in self._duty)
+            if frame == self._sent:
+                return False
+            self._sent = frame
+            self.car.set_motor_model(*frame)
+            self.frames_sent += 1
+            return True
+
+    def _run(self) -> None:
+        next_tick = time.monotonic()
+        while self._running.is_set():
+            self.tick(self.period)
+            next_tick += self.period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()    # Overrun: do not try to catch up
+
+    def close(self) -> None:
+        """Stop the control thread, the wheels keep their last duty."""
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
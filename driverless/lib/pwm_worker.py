@@ -0,0 +1,94 @@
+import threading
+
+# ============================================================================
+# Asynchronous PCA9685 writer with latest-wins coalescing
+# ============================================================================
+
+class PWMWorker:
+    """Dedicated thread that owns the channel writes of one PCA9685.
+
+    Callers post (on, off) values per channel and return at once. Values
+    posted for a channel that has not been flushed yet replace the old ones,
+    so a slow bus never builds a backlog. Each flush writes the pending
+    channels as contiguous runs, one block transaction per run.
+    """
+
+    def __init__(self, pwm):
+        self.pwm = pwm
+        self.posted = 0       # Channel values posted by callers
+        self.coalesced = 0    # Values dropped because a newer one arrived first
+        self.flushes = 0      # Frames written to the bus
+        self._pending = {}    # channel -> (on, off)
+        self._busy = False
+        self._running = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="pca9685-0x{:02X}".format(pwm.address), daemon=True)
+        self._thread.start()
+
+    def post(self, first_channel: int, values: list) -> None:
+        """Queue (on, off) pairs for adjacent channels starting at first_channel."""
+        with self._cond:
+            for i, value in enumerate(values):
+                if first_channel + i in self._pending:
+                    self.coalesced += 1
+                self._pending[first_channel + i] = value
+            self.posted += len(values)
+            self._cond.notify_all()
+
+    def discard(self) -> None:
+        """Drop every value that has not been written yet."""
+        with self._cond:
+            self.coalesced += len(self._pending)
+            self._pending.clear()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until every posted value is on the chip, False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def is_worker_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    @staticmethod
+    def runs(frame: dict) -> list:
+        """Split {channel: value} into [(first_channel, [values...]), ...] of adjacent channels."""
+        result = []
+        for channel in sorted(frame):
+            if result and result[-1][0] + len(result[-1][1]) == channel:
+                result[-1][1].append(frame[channel])
+            else:
+                result.append((channel, [frame[channel]]))
+        return result
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or not self._running)
+                if not self._pending:
+                    break
+            # The frame is only taken once the bus is held: a discard() followed by a
+            # broadcast either drops it first or waits for this write to finish
+            with self.pwm.bus.transaction():
+                with self._cond:
+                    frame = self._pending
+                    self._pending = {}
+                    self._busy = bool(frame)
+                if not frame:
+                    continue
+                try:
+                    for first_channel, values in self.runs(frame):
+                        self.pwm.write_pwm_range(first_channel, values)
+                    self.flushes += 1
+                except OSError as e:
+                    print(f"PCA9685 worker: {e}")
+                finally:
+                    with self._cond:
+                        self._busy = False
+                        self._cond.notify_all()
+
+    def close(self) -> None:
+        """Write what is still pending and stop the thread."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
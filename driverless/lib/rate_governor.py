@@ -0,0 +1,73 @@
+import math
+import threading
+import time
+
+# ============================================================================
+# Sampling rate governor driven by the motion state
+# ============================================================================
+
+class RateGovernor:
+    """Chooses a sampling rate per sensor from the wheel duties and the obstacle distance.
+
+    Each channel is configured as name -> (idle_hz, max_hz, obstacle). The
+    demand is the forward speed as a fraction of full_duty, raised to the
+    proximity of the obstacle for channels with obstacle=True. Stopped or
+    turning in place the demand is zero and every channel runs at idle_hz.
+    Rates rise at once and fall with the decay time constant, so a short
+    stop does not leave the sensors slow when the rover moves again.
+    rates() is lock-free: update() publishes a new dict with one assignment.
+    """
+
+    def __init__(self, channels: dict, full_duty: float = 1000.0, near: float = 80.0,
+                 idle_duty: float = 50.0, decay: float = 1.0):
+        self.channels = dict(channels)
+        self.full_duty = full_duty
+        self.near = near                # cm, proximity is 0 from here on and 1 at the sensor
+        self.idle_duty = idle_duty      # |duty| below this counts as stopped
+        self.decay = decay              # s
+        self.state = "stopped"
+        self._rates = {name: float(idle) for name, (idle, _, _) in self.channels.items()}
+        self._t = None
+        self._lock = threading.Lock()
+
+    def motion_state(self, duties) -> tuple:
+        """('stopped' | 'turning' | 'forward' | 'reverse', forward speed 0-1)."""
+        if max(abs(d) for d in duties) < self.idle_duty:
+            return "stopped", 0.0
+        mean = sum(duties) / len(duties)    # Forward duties are negative on this car
+        if abs(mean) < self.idle_duty:
+            return "turning", 0.0
+        if mean > 0:
+            return "reverse", 0.0
+        return "forward", min(-mean / self.full_duty, 1.0)
+
+    def update(self, duties, distance: float = float('nan'), now: float = None) -> dict:
+        """Recompute the rates, returns the new name -> Hz dict."""
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            state, speed = self.motion_state(duties)
+            proximity = 0.0
+            if state in ("forward", "reverse") and not math.isnan(distance):
+                proximity = min(max((self.near - distance) / self.near, 0.0), 1.0)
+            dt = 0.0 if self._t is None else now - self._t
+            fall = 1.0 - math.exp(-dt / self.decay)
+            rates = {}
+            for name, (idle, top, obstacle) in self.channels.items():
+                demand = max(speed, proximity) if obstacle else speed
+                target = idle + (top - idle) * demand
+                current = self._rates[name]
+                rates[name] = target if target >= current else current + (target - current) * fall
+            self.state = state
+            self._t = now
+            self._rates = rates
+            return rates
+
+    def rates(self) -> dict:
+        return self._rates
+
+    def rate(self, name: str) -> float:
+        return self._rates[name]
+
+    def period(self, name: str) -> float:
+        return 1.0 / self._rates[name]
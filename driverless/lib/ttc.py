@@ -0,0 +1,66 @@
+import math
+import time
+import numpy
+
+# ============================================================================
+# Time-to-collision from the ultrasonic distance history
+# ============================================================================
+
+class TTCEstimator:
+    """Closing speed and time to collision from timestamped distance records.
+
+    The closing speed is minus the Theil-Sen slope (median of the slopes
+    between every pair of samples) of distance over time across the last
+    window seconds of valid samples: the raw pings are used, and unlike a
+    least-squares fit a single bad ping cannot tilt the line. latest() is
+    published with a single assignment, like UltrasonicStream.latest().
+    Without enough valid samples the result is unknown (infinite TTC, NaN
+    distance) and stamped with the current time, never an old estimate.
+    """
+
+    def __init__(self, window: float = 0.5, min_samples: int = 4, min_closing_speed: float = 2.0):
+        self.window = window                        # s
+        self.min_samples = min_samples
+        self.min_closing_speed = min_closing_speed  # cm/s, below this the TTC is infinite
+        self._latest = (math.inf, 0.0, float('nan'), 0.0)
+
+    def update(self, records: numpy.ndarray) -> tuple:
+        """Fit the records (fields t, raw, valid, oldest first) and publish the result.
+
+        Returns (ttc in s, closing speed in cm/s, fitted distance in cm, timestamp).
+        """
+        if len(records) == 0:
+            return self._unknown(time.monotonic())
+        now = records['t'][-1]
+        use = records['valid'] & (records['t'] >= now - self.window)
+        if numpy.count_nonzero(use) < self.min_samples:
+            return self._unknown(now)
+        t = records['t'][use]
+        d = records['raw'][use].astype(numpy.float64)
+        t = t - t[-1]                               # Fit around the newest sample: intercept = distance now
+        i, j = numpy.triu_indices(len(t), 1)
+        dt = t[j] - t[i]
+        pair = dt > 0.0
+        if not pair.any():
+            return self._unknown(now)
+        slope = numpy.median((d[j] - d[i])[pair] / dt[pair])
+        distance = numpy.median(d - slope * t)
+        closing = 0.0 - slope                      # Not -0.0 for a flat fit
+        ttc = distance / closing if closing > self.min_closing_speed else math.inf
+        self._latest = (max(float(ttc), 0.0), float(closing), float(distance), float(now))
+        return self._latest
+
+    def _unknown(self, now: float) -> tuple:
+        self._latest = (math.inf, 0.0, float('nan'), float(now))
+        return self._latest
+
+    def latest(self) -> tuple:
+        """(ttc in s, closing speed in cm/s, fitted distance in cm, timestamp)."""
+        return self._latest
+
+
+def ttc_threshold(base_ttc: float, forward_duty: float, reference_duty: float) -> float:
+    """TTC below which to react, proportional to the commanded forward duty."""
+    if forward_duty <= 0:
+        return 0.0
+    return base_ttc * forward_duty / reference_duty
@@ -1,16 +1,20 @@
 from gpiozero import DistanceSensor, PWMSoftwareFallback, DistanceSensorNoEcho
+import math
+import threading
 import warnings
 import time
+import numpy
 
 class Ultrasonic:
-    def __init__(self, trigger_pin: int = 27, echo_pin: int = 22, max_distance: float = 3.0):
+    def __init__(self, trigger_pin: int = 27, echo_pin: int = 22, max_distance: float = 3.0, queue_len: int = 1):
         # Initialize the Ultrasonic class and set up the distance sensor.
         warnings.filterwarnings("ignore", category = DistanceSensorNoEcho)
         warnings.filterwarnings("ignore", category = PWMSoftwareFallback)  # Ignore PWM software fallback warnings
         self.trigger_pin = trigger_pin  # Set the trigger pin number
         self.echo_pin = echo_pin        # Set the echo pin number
         self.max_distance = max_distance  # Set the maximum distance
-        self.sensor = DistanceSensor(echo=self.echo_pin, trigger=self.trigger_pin, max_distance=self.max_distance)  # Initialize the distance sensor
+        self.queue_len = queue_len        # gpiozero median length, 1: raw pings, UltrasonicStream filters them
+        self.sensor = DistanceSensor(echo=self.echo_pin, trigger=self.trigger_pin, max_distance=self.max_distance, queue_len=self.queue_len)  # Initialize the distance sensor
 
     def __enter__(self):
         return self
@@ -32,10 +36,168 @@ class Ultrasonic:
             print(f"Warning: {e}")
             return None
 
+    def get_raw_distance(self) -> float:
+        """Latest ping in centimeters, not rounded: two pings practically never give the same value."""
+        try:
+            return float(self.sensor.distance * 100)
+        except RuntimeWarning as e:
+            print(f"Warning: {e}")
+            return None
+
     def close(self):
         # Close the distance sensor.
         self.sensor.close()  # Close the sensor to release resources
 
+# Record stored for every sample of an UltrasonicStream
+SAMPLE_DTYPE = numpy.dtype([('t', 'f8'), ('raw', 'f4'), ('valid', '?')])
+
+class MedianFilter:
+    """Median of the last valid samples, rejects single-sample spikes."""
+    def __init__(self, window: int = 5):
+        self.window = numpy.full(window, numpy.nan)
+        self.index = 0
+
+    def reset(self):
+        self.window[:] = numpy.nan
+        self.index = 0
+
+    def update(self, t: float, value: float) -> tuple:
+        """Add a valid sample, returns (filtered value, confidence 0-1)."""
+        self.window[self.index % len(self.window)] = value
+        self.index += 1
+        samples = self.window[~numpy.isnan(self.window)]
+        median = float(numpy.median(samples))
+        spread = float(numpy.median(numpy.abs(samples - median)))     # Median absolute deviation
+        fill = len(samples) / len(self.window)
+        return median, fill / (1.0 + spread / max(median, 1.0) * 10.0)
+
+class EWMAFilter:
+    """Exponential moving average with a time constant, handles uneven sampling."""
+    def __init__(self, tau: float = 0.15):
+        self.tau = tau
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.variance = 0.0
+        self.t = None
+
+    def update(self, t: float, value: float) -> tuple:
+        if self.value is None:
+            self.value, self.t = value, t
+            return value, 0.5
+        alpha = 1.0 - math.exp(-max(t - self.t, 0.0) / self.tau)
+        error = value - self.value
+        self.value += alpha * error
+        self.variance = (1.0 - alpha) * (self.variance + alpha * error * error)
+        self.t = t
+        return self.value, 1.0 / (1.0 + math.sqrt(self.variance) / max(self.value, 1.0) * 10.0)
+
+class KalmanFilter1D:
+    """Constant-distance Kalman filter, q in cm^2/s of process noise, r in cm^2 of sensor noise."""
+    def __init__(self, q: float = 400.0, r: float = 4.0):
+        self.q = q
+        self.r = r
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.p = 0.0
+        self.t = None
+
+    def update(self, t: float, value: float) -> tuple:
+        if self.value is None:
+            self.value, self.p, self.t = value, self.r, t
+        else:
+            self.p += self.q * max(t - self.t, 0.0)          # Predict
+            gain = self.p / (self.p + self.r)                  # Update
+            self.value += gain * (value - self.value)
+            self.p *= 1.0 - gain
+            self.t = t
+        return self.value, 1.0 / (1.0 + math.sqrt(self.p) / max(self.value, 1.0) * 10.0)
+
+class UltrasonicStream:
+    """Samples an Ultrasonic at a fixed rate into a NumPy ring buffer of (t, raw, valid) records.
+
+    latest() is lock-free: the writer publishes a new (value, confidence,
+    timestamp) tuple with a single assignment, readers never wait on it.
+    history() copies under a short lock so a record is never read half written.
+    DistanceSensor pings about every 60 ms; a valid reading equal to the
+    previous one is the same ping read again and is not stored, so the
+    filters see every ping once whatever the sampling rate.
+    """
+    def __init__(self, sensor: Ultrasonic, rate: float = 20.0, size: int = 256, filter=None,
+                 min_valid: float = 2.0, max_valid: float = 250.0):
+        self.sensor = sensor
+        self.period = 1.0 / rate
+        self.filter = filter if filter is not None else MedianFilter()
+        self.min_valid = min_valid
+        self.max_valid = max_valid
+        self.buffer = numpy.zeros(size, dtype=SAMPLE_DTYPE)
+        self.count = 0                                # Samples written so far
+        self.repeated = 0                             # Reads skipped because no new ping had arrived
+        self._last_raw = None
+        self._latest = (float('nan'), 0.0, 0.0)
+        self._buffer_lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+
+    def set_rate(self, rate: float) -> None:
+        self.period = 1.0 / rate
+
+    def sample(self) -> bool:
+        """Take one reading, store it and update the filter, True if it was a new valid ping."""
+        raw = self.sensor.get_raw_distance()
+        t = time.monotonic()
+        valid = raw is not None and self.min_valid <= raw <= self.max_valid
+        if valid and raw == self._last_raw:
+            self.repeated += 1
+            return False
+        self._last_raw = raw
+        with self._buffer_lock:
+            self.buffer[self.count % len(self.buffer)] = (t, raw if raw is not None else numpy.nan, valid)
+            self.count += 1
+        if valid:
+            value, confidence = self.filter.update(t, float(raw))
+        else:
+            value, confidence = self._latest[0], self._latest[1]
+        # Confidence also drops with the share of invalid readings among the last ones
+        recent = self.history(8)['valid']
+        self._latest = (value, confidence * float(numpy.mean(recent)), t)
+        return valid
+
+    def latest(self) -> tuple:
+        """(filtered distance in cm, confidence 0-1, monotonic timestamp), NaN before the first valid sample."""
+        return self._latest
+
+    def history(self, n: int = None) -> numpy.ndarray:
+        """Copy of the last n records, oldest first."""
+        size = len(self.buffer)
+        with self._buffer_lock:
+            count = self.count
+            n_records = min(count, size if n is None else min(n, size))
+            return self.buffer[numpy.arange(count - n_records, count) % size]
+
+    def start(self) -> None:
+        """Sample on a background thread instead of calling sample() yourself."""
+        if self._thread is None:
+            self._running.set()
+            self._thread = threading.Thread(target=self._run, name="ultrasonic", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        next_sample = time.monotonic()
+        while self._running.is_set():
+            self.sample()
+            next_sample = max(next_sample + self.period, time.monotonic())
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+
+    def close(self) -> None:
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
 if __name__ == '__main__':
     # Initialize the Ultrasonic instance with default pin numbers and max distance
     with Ultrasonic() as ultrasonic:
@@ -5,13 +5,23 @@ Hilos:
 - Hilo 1: Sensor ultrasónico (actualiza distancia compartida)
 - Hilo 2: Control del rover (avance + evasión de obstáculos)
 - Hilo 3: LEDs siempre encendidos (animación tipo wheel)
-- Hilo 4: Sensores infrarrojos (opcional, solo lectura)
+- Hilo 4: Sensores infrarrojos (opcional, solo lectura; espera los cambios en vez de sondear)
 
 Correcciones incluidas:
-- El control usa la distancia DEL EVENTO (d) en vez de DISTANCIA_CM (evita "OBSTACULO a 300cm")
-- Filtro de lecturas inválidas del ultrasonido (None, <=0, o demasiado altas tipo 300)
-- Cooldown anti-rebote para no encadenar evasiones
-- Limpieza de cola tras manejar un evento (descarta eventos viejos acumulados)
+- El control usa la distancia DEL EVENTO (d) en vez de la última lectura (evita "OBSTACULO a 300cm")
+- Lecturas inválidas del ultrasonido (None, <=0, o demasiado altas tipo 300) marcadas en el buffer
+- Distancia filtrada (mediana) con confianza: un pico aislado ya no provoca una evasión
+- La evasión es una maniobra temporizada no bloqueante: durante el giro un
+  obstáculo nuevo la reinicia en el siguiente periodo de control
+- El disparo usa el tiempo hasta colisión (pendiente por mínimos cuadrados del
+  historial) con un umbral proporcional al duty de avance; a más velocidad se
+  reacciona antes y parado solo cuenta la distancia mínima
+- Frecuencias de muestreo adaptativas: ultrasonido, IR y LEDs bajan al mínimo
+  con el rover parado o girando y suben con la velocidad o un obstáculo cerca
+- El giro de evasión ya no es siempre 90° a la izquierda: se elige el rumbo más
+  despejado según las distancias medidas en cada rumbo recorrido (solo hay sonar
+  frontal, así que se recuerdan las lecturas hechas avanzando), penalizando
+  giros grandes y rumbos elegidos hace poco
 """
 
 import time
@@ -23,14 +33,27 @@ from lib.buzzer import Buzzer
 from lib.infrared import Infrared
 from lib.leds import Freenove_SPI_LedPixel
 from lib.motor import Ordinary_Car
-from lib.ultrasonido import Ultrasonic
+from lib.motion import MotionController
+from lib.maneuver import Maneuver, ManeuverEngine, Step
+from lib.ultrasonido import Ultrasonic, UltrasonicStream, MedianFilter
+from lib.ttc import TTCEstimator, ttc_threshold
+from lib.rate_governor import RateGovernor
+from lib.heading import HeadingPlanner
 
 # ------------------------------------------------
 # Variables compartidas y mecanismos de sincronización
 # ------------------------------------------------
-DISTANCIA_CM = 999.0
 VALOR_IR = 0
 
+# Flujo filtrado del ultrasonido; se lee con latest() sin tomar LOCK_ESTADO
+FLUJO_DISTANCIA = None
+
+# Tiempo hasta colisión estimado; se lee con latest() igual que el flujo
+ESTIMADOR_TTC = None
+
+# Controlador de movimiento: el hilo ultrasónico lee de aquí el duty comandado
+MOVIMIENTO = None
+
 LOCK_ESTADO = threading.Lock()
 EVENTO_STOP = threading.Event()
 
@@ -40,66 +63,108 @@ COLA_OBSTACULO = queue.Queue(maxsize=1)
 # ------------------------------------------------
 # Parámetros de configuración
 # ------------------------------------------------
-UMBRAL_OBSTACULO_CM = 60
+# Tiempo hasta colisión (s) con el que se reacciona a VEL_ADELANTE; escala con el duty
+TTC_UMBRAL_S = 1.5
+# Ventana de la regresión de la velocidad de cierre (s)
+VENTANA_TTC_S = 0.5
+# Por debajo de esta distancia se evade siempre, aunque el rover esté parado o girando
+DISTANCIA_MINIMA_CM = 15
 
 # Rango válido de medición (ajusta según tu sensor/lib; 300 suele ser "sin eco")
 DISTANCIA_MIN_VALIDA = 2.0
 DISTANCIA_MAX_VALIDA = 250.0
 
+# Filtro de la distancia: mediana de las últimas muestras y confianza mínima para actuar
+VENTANA_MEDIANA = 5
+CONFIANZA_MIN = 0.5
+
 # Velocidades de los motores
 VEL_ADELANTE = 1000
 VEL_GIRO = 1000
 
+# Rampas de velocidad (unidades de duty por segundo) y frecuencia del controlador
+FRECUENCIA_MOVIMIENTO_HZ = 100
+ACELERACION_MAX = 10000
+DECELERACION_MAX = 20000
+
 # Tiempo aproximado para retroceder (ajustable)
 TIEMPO_RETROCEDER = 0.2
 
 # Tiempo aproximado para girar 90 grados (ajustable)
 TIEMPO_GIRO_90 = 1.0
 
-# Periodos de ejecución
-PERIODO_SENSOR = 0.05
+# Giro mínimo de una evasión (grados): de frente está el obstáculo
+GIRO_MINIMO_EVASION = 45
+
+# Periodo del hilo de control (también actualiza las frecuencias de muestreo)
 PERIODO_CONTROL = 0.05
-PERIODO_LED = 0.01
-PERIODO_IR = 0.10
 
-# Anti-rebote: tiempo mínimo entre evasiones
-COOLDOWN_OBSTACULO_S = 1.0
+# Frecuencias de muestreo (Hz): (parado o girando, máxima, sube con un obstáculo cerca)
+# El DistanceSensor de gpiozero hace un ping cada 60 ms (~16 Hz): muestrear más rápido no aporta lecturas nuevas
+FRECUENCIA_SENSOR = (5, 15, True)
+FRECUENCIA_IR = (2, 10, False)
+FRECUENCIA_LED = (20, 100, False)
+# Distancia desde la que un obstáculo empieza a subir la frecuencia del ultrasonido
+DISTANCIA_CERCANA_CM = 80
+
+# Alerta sonora de evasión: beep rápido + 3 pitidos cortos, pares (on_ms, off_ms)
+PATRON_ALERTA = [(150, 80), (80, 80), (80, 80), (80, 80)]
+
+# Prioridad de la maniobra de evasión (una de prioridad mayor la interrumpe siempre)
+PRIORIDAD_EVASION = 1
+
+# Frecuencias de muestreo efectivas; las fija el hilo de control y cada hilo lee la suya sin bloquear
+GOBERNADOR = RateGovernor(
+    {"sensor": FRECUENCIA_SENSOR, "ir": FRECUENCIA_IR, "led": FRECUENCIA_LED},
+    full_duty=VEL_ADELANTE, near=DISTANCIA_CERCANA_CM
+)
+
+# Rumbo estimado (a lazo abierto) y distancias vistas en cada rumbo; elige los giros de evasión
+PLANIFICADOR = HeadingPlanner(turn_duty=VEL_GIRO, turn_rate=90 / TIEMPO_GIRO_90)
 
 
 # ------------------------------------------------
 # Hilo 1: Sensor ultrasónico
 # ------------------------------------------------
 def hilo_ultrasonico():
-    global DISTANCIA_CM
+    global FLUJO_DISTANCIA, ESTIMADOR_TTC
     sensor = Ultrasonic()
+    flujo = UltrasonicStream(
+        sensor, rate=GOBERNADOR.rate("sensor"), filter=MedianFilter(VENTANA_MEDIANA),
+        min_valid=DISTANCIA_MIN_VALIDA, max_valid=DISTANCIA_MAX_VALIDA
+    )
+    FLUJO_DISTANCIA = flujo
+    estimador = TTCEstimator(window=VENTANA_TTC_S)
+    ESTIMADOR_TTC = estimador
+    muestras_ventana = int(VENTANA_TTC_S * FRECUENCIA_SENSOR[1]) + 2
 
     try:
         while not EVENTO_STOP.is_set():
-            distancia = sensor.get_distance()
-
-            # Filtrar lecturas inválidas / fuera de rango (típico 300 = sin eco)
-            if (
-                distancia is None
-                or not isinstance(distancia, (int, float))
-                or distancia < DISTANCIA_MIN_VALIDA
-                or distancia > DISTANCIA_MAX_VALIDA
-            ):
-                time.sleep(PERIODO_SENSOR)
-                continue
-
-            # Actualizar variable compartida SOLO con datos válidos
-            with LOCK_ESTADO:
-                DISTANCIA_CM = float(distancia)
-
-            # Notificar obstáculo si está muy cerca
-            if distancia < UMBRAL_OBSTACULO_CM:
-                try:
-                    # Guardamos la distancia del evento en la cola
-                    COLA_OBSTACULO.put_nowait(("OBSTACULO", time.time(), float(distancia)))
-                except queue.Full:
-                    pass
-
-            time.sleep(PERIODO_SENSOR)
+            # Las lecturas fuera de rango (típico 300 = sin eco) quedan marcadas como no válidas
+            if flujo.sample():
+                distancia, confianza, t = flujo.latest()
+                ttc, _, _, _ = estimador.update(flujo.history(muestras_ventana))
+
+                # Duty de avance comandado (la marcha adelante es negativa); girando se anula
+                avance = 0.0
+                if MOVIMIENTO is not None:
+                    avance = max(0.0, -sum(MOVIMIENTO.get_duty()) / 4)
+                umbral_ttc = ttc_threshold(TTC_UMBRAL_S, avance, VEL_ADELANTE)
+
+                # Solo avanzando en línea recta se sabe hacia qué rumbo mira el sonar
+                if avance > 0 and confianza >= CONFIANZA_MIN:
+                    PLANIFICADOR.observe(0, distancia)
+
+                # Notificar obstáculo solo con la distancia filtrada (un pico aislado no dispara)
+                if confianza >= CONFIANZA_MIN and (distancia < DISTANCIA_MINIMA_CM or ttc < umbral_ttc):
+                    try:
+                        # Guardamos la distancia y el TTC del evento en la cola
+                        COLA_OBSTACULO.put_nowait(("OBSTACULO", time.time(), float(distancia), ttc))
+                    except queue.Full:
+                        pass
+
+            flujo.set_rate(GOBERNADOR.rate("sensor"))
+            time.sleep(flujo.period)
 
     finally:
         try:
@@ -114,13 +179,14 @@ def hilo_ultrasonico():
 def hilo_infrarrojo():
     global VALOR_IR
     ir = Infrared()
+    secuencia = None
 
     try:
         while not EVENTO_STOP.is_set():
-            valor = ir.read_all_infrared()
+            # Los cambios llegan por flancos de los sensores; el periodo solo limita la espera
+            valor, t, secuencia = ir.wait_for_change(secuencia, timeout=GOBERNADOR.period("ir"))
             with LOCK_ESTADO:
                 VALOR_IR = int(valor)
-            time.sleep(PERIODO_IR)
     finally:
         try:
             ir.close()
@@ -149,7 +215,7 @@ def hilo_leds():
                 )
             leds.show()
             j = (j + 1) % 256
-            time.sleep(PERIODO_LED)
+            time.sleep(GOBERNADOR.period("led"))
 
     finally:
         try:
@@ -162,94 +228,75 @@ def hilo_leds():
 # Hilo 4: Control del rover + seguridad
 # ------------------------------------------------
 def hilo_control():
+    global MOVIMIENTO
     motores = Ordinary_Car()
     buzzer = Buzzer()
 
-    def detener():
-        motores.set_motor_model(0, 0, 0, 0)
-
-    def avanzar():
-        motores.set_motor_model(
-            -VEL_ADELANTE, -VEL_ADELANTE,
-            -VEL_ADELANTE, -VEL_ADELANTE
-        )
-
-    def retroceder():
-        motores.set_motor_model(
-            VEL_ADELANTE, VEL_ADELANTE,
-            VEL_ADELANTE, VEL_ADELANTE
-        )
-        time.sleep(TIEMPO_RETROCEDER)
-        detener()
-
-    def girar_izquierda_90():
-        motores.set_motor_model(
-            -VEL_GIRO, -VEL_GIRO,
-            VEL_GIRO, VEL_GIRO
-        )
-        time.sleep(TIEMPO_GIRO_90)
-        detener()
-
-    def alerta_buzzer():
-        for _ in range(3):
-            buzzer.set_state(True)
-            time.sleep(0.08)
-            buzzer.set_state(False)
-            time.sleep(0.08)
-
-    def limpiar_cola_obstaculo():
-        # Descarta eventos viejos acumulados
-        while True:
-            try:
-                COLA_OBSTACULO.get_nowait()
-            except queue.Empty:
-                break
-
-    ultimo_evento = 0.0
+    # Las rampas las aplica el controlador en su propio hilo, aquí solo se fijan objetivos
+    movimiento = MotionController(
+        motores, FRECUENCIA_MOVIMIENTO_HZ, ACELERACION_MAX, DECELERACION_MAX
+    )
+    movimiento.start()
+    MOVIMIENTO = movimiento
+
+    # Pasos de las maniobras: (motores, duración); nada bloquea el hilo de control
+    PARAR = (0, 0, 0, 0)
+    ADELANTE = (-VEL_ADELANTE, -VEL_ADELANTE, -VEL_ADELANTE, -VEL_ADELANTE)
+    ATRAS = (VEL_ADELANTE, VEL_ADELANTE, VEL_ADELANTE, VEL_ADELANTE)
+
+    def aplicar(paso):
+        # Lleva el estado de un paso a los actuadores
+        if paso.duties is not None:
+            movimiento.set_target(*paso.duties)
+        if isinstance(paso.buzzer, bool):
+            buzzer.set_state(paso.buzzer)
+        elif paso.buzzer is not None:
+            # Patrón (on_ms, off_ms): suena en segundo plano mientras sigue la maniobra
+            buzzer.play(paso.buzzer)
+
+    def maniobra_evasion():
+        # Giro hacia el rumbo más despejado; el retroceso no se interrumpe, el giro y la pausa final sí
+        giro = PLANIFICADOR.plan(min_turn=GIRO_MINIMO_EVASION)
+        motores_giro, tiempo_giro = PLANIFICADOR.turn_command(giro)
+        print(f"[EVASION] Giro de {giro:+.0f}° ({tiempo_giro:.2f} s)")
+        return Maneuver("evasion", [
+            Step("retroceder", ATRAS, TIEMPO_RETROCEDER, buzzer=PATRON_ALERTA, preemptible=False),
+            Step("girar", motores_giro, tiempo_giro),
+            Step("pausa", PARAR, 0.1),
+        ], priority=PRIORIDAD_EVASION)
+
+    maniobras = ManeuverEngine(aplicar)
 
     try:
         print("[CONTROL] Rover avanzando...")
-        avanzar()
 
         while not EVENTO_STOP.is_set():
             try:
-                evento, t, d = COLA_OBSTACULO.get_nowait()
+                evento, t, d, ttc = COLA_OBSTACULO.get_nowait()
             except queue.Empty:
-                time.sleep(PERIODO_CONTROL)
-                continue
-
-            if evento != "OBSTACULO":
-                continue
-
-            # Anti-rebote / cooldown para evitar bucle de evasión
-            ahora = time.time()
-            if (ahora - ultimo_evento) < COOLDOWN_OBSTACULO_S:
-                continue
-            ultimo_evento = ahora
+                evento = None
 
-            # Usar la distancia del EVENTO (d), no la distancia global (que puede ser 300)
-            print(f"[EMERGENCIA] Obstáculo detectado a {d:.1f} cm")
+            # Un obstáculo nuevo durante el giro reinicia la evasión en este mismo periodo
+            if evento == "OBSTACULO" and maniobras.can_start(PRIORIDAD_EVASION):
+                # Usar la distancia del EVENTO (d), no la distancia global (que puede ser 300)
+                print(f"[EMERGENCIA] Obstáculo detectado a {d:.1f} cm (TTC {ttc:.2f} s)")
 
-            detener()
-            retroceder()
-
-            # beep rápido + alerta
-            buzzer.set_state(True)
-            time.sleep(0.15)
-            buzzer.set_state(False)
+                # Frenado inmediato, sin rampa, en una sola escritura I2C de los canales 0-7
+                movimiento.stop(immediate=True)
+                maniobras.start(maniobra_evasion())
 
-            alerta_buzzer()
-            girar_izquierda_90()
+            if maniobras.tick() is None:
+                movimiento.set_target(*ADELANTE)
 
-            # Limpia cola para no re-ejecutar maniobras por eventos viejos
-            limpiar_cola_obstaculo()
+            # Frecuencias de muestreo según el movimiento real (con rampas) y la distancia filtrada
+            distancia = FLUJO_DISTANCIA.latest()[0] if FLUJO_DISTANCIA is not None else float("nan")
+            GOBERNADOR.update(movimiento.get_duty(), distancia)
 
-            time.sleep(0.1)
-            avanzar()
+            time.sleep(PERIODO_CONTROL)
 
     finally:
         try:
-            detener()
+            movimiento.close()
             motores.close()
         except Exception:
             pass
@@ -279,8 +326,17 @@ def main():
 
     try:
         while True:
+            distancia, confianza, ttc = float("nan"), 0.0, float("inf")
+            if FLUJO_DISTANCIA is not None:
+                distancia, confianza, _ = FLUJO_DISTANCIA.latest()
+            if ESTIMADOR_TTC is not None:
+                ttc = ESTIMADOR_TTC.latest()[0]
             with LOCK_ESTADO:
-                print(f"[ESTADO] Distancia={DISTANCIA_CM:.1f} cm | IR={VALOR_IR}")
+                ir = VALOR_IR
+            frecuencias = GOBERNADOR.rates()
+            print(f"[ESTADO] Distancia={distancia:.1f} cm (conf {confianza:.2f}) | TTC={ttc:.2f} s | IR={ir}")
+            print(f"[ESTADO] Muestreo ({GOBERNADOR.state}): ultrasonido={frecuencias['sensor']:.0f} Hz "
+                  f"| IR={frecuencias['ir']:.0f} Hz | LEDs={frecuencias['led']:.0f} Hz")
             time.sleep(0.5)
 
     except KeyboardInterrupt:
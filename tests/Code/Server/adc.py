@@ -1,4 +1,4 @@
-import smbus  # Import the smbus module for I2C communication
+from i2c_bus import get_bus  # Import the shared I2C bus registry
 import time  # Import the time module for sleep functionality
 from parameter import ParameterManager  # Import the ParameterManager class from the parameter module
 
@@ -10,7 +10,7 @@ class ADC:
         self.parameter_manager = ParameterManager()                           # Create an instance of ParameterManager
         self.pcb_version = self.parameter_manager.get_pcb_version()           # Get the PCB version
         self.adc_voltage_coefficient = 3.3 if self.pcb_version == 1 else 5.2  # Set the ADC voltage coefficient based on the PCB version
-        self.i2c_bus = smbus.SMBus(1)                                         # Initialize the I2C bus
+        self.i2c_bus = get_bus(1)                                             # Shared handle of I2C bus 1
 
     def _read_stable_byte(self) -> int:
         """Read a stable byte from the ADC."""
@@ -23,8 +23,9 @@ class ADC:
     def read_adc(self, channel: int) -> float:
         """Read the ADC value for the specified channel using ADS7830."""
         command_set = self.ADS7830_COMMAND | ((((channel << 2) | (channel >> 1)) & 0x07) << 4)  # Calculate the command set for the specified channel
-        self.i2c_bus.write_byte(self.I2C_ADDRESS, command_set)                # Write the command set to the ADC
-        value = self._read_stable_byte()                                      # Read a stable byte from the ADC
+        with self.i2c_bus.transaction():                                      # Keep the command and its reads together
+            self.i2c_bus.write_byte(self.I2C_ADDRESS, command_set)            # Write the command set to the ADC
+            value = self._read_stable_byte()                                  # Read a stable byte from the ADC
         voltage = value / 255.0 * self.adc_voltage_coefficient                # Convert the ADC value to voltage
         return round(voltage, 2)                                              # Return the voltage rounded to 2 decimal places
 
@@ -39,8 +40,8 @@ class ADC:
                 pass                                                          # Ignore any OSError exceptions
 
     def close_i2c(self) -> None:
-        """Close the I2C bus."""
-        self.i2c_bus.close()                                                  # Close the I2C bus
+        """Release the shared I2C bus."""
+        self.i2c_bus.close()                                                  # Closed once the last user releases it
 
 if __name__ == '__main__':
     print('Program is starting ... ')                                        # Print a message indicating the start of the program
@@ -1,4 +1,6 @@
 import time
+import threading
+from collections import deque
 from gpiozero import OutputDevice
 
 class Buzzer:
@@ -6,23 +8,89 @@ class Buzzer:
         """Initialize the Buzzer class."""
         self.PIN = 17                            # Set the GPIO pin for the buzzer
         self.buzzer_pin = OutputDevice(self.PIN) # Initialize the buzzer pin
+        self._patterns = deque()                 # Patterns waiting to be played: (pattern, repeat)
+        self._generation = 0                     # Bumped to cancel the pattern being played
+        self._busy = False
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = None
 
     def set_state(self, state: bool) -> None:
-        """Set the state of the buzzer."""
+        """Set the state of the buzzer, cancels any pattern being played."""
+        self.stop()
         self.buzzer_pin.on() if state else self.buzzer_pin.off() # Turn on or off the buzzer based on the state
 
+    def play(self, pattern, repeat: int = 1, queue: bool = False) -> None:
+        """Play a sequence of (on_ms, off_ms) pairs in the background and return immediately.
+
+        By default the new pattern replaces the one being played, with
+        queue=True it starts when the current one finishes.
+        """
+        with self._cond:
+            if not queue:
+                self._patterns.clear()
+                self._generation += 1
+            self._patterns.append((list(pattern), repeat))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="buzzer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def stop(self) -> None:
+        """Cancel the current and the queued patterns, returns once the buzzer is off."""
+        with self._cond:
+            self._patterns.clear()
+            self._generation += 1
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: not self._busy)
+
+    def is_playing(self) -> bool:
+        return self._busy or bool(self._patterns)
+
+    def _sleep(self, ms: float, generation: int) -> bool:
+        """Wait ms milliseconds, True if the pattern was cancelled meanwhile."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._generation != generation or self._closing, ms / 1000.0)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._patterns or self._closing)
+                if self._closing:
+                    break
+                pattern, repeat = self._patterns.popleft()
+                generation = self._generation
+                self._busy = True
+            cancelled = False
+            for _ in range(repeat):
+                for on_ms, off_ms in pattern:
+                    self.buzzer_pin.on()
+                    cancelled = self._sleep(on_ms, generation)
+                    self.buzzer_pin.off()
+                    if cancelled or self._sleep(off_ms, generation):
+                        cancelled = True
+                        break
+                if cancelled:
+                    break
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
     def close(self) -> None:
         """Close the buzzer pin."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
         self.buzzer_pin.close()           # Close the buzzer pin to release the GPIO resource
 
 if __name__ == '__main__':
     print('Program is starting ... ')     # Print a message indicating the start of the program
     buzzer = Buzzer()                     # Create an instance of the Buzzer class
     try:
-        for _ in range(3):
-            buzzer.set_state(True)        # Turn on the buzzer
-            time.sleep(0.1)               # Wait for 0.1 second
-            buzzer.set_state(False)       # Turn off the buzzer
-            time.sleep(0.1)               # Wait for 0.1 second
+        buzzer.play([(100, 100)], repeat=3)  # Three short beeps, played in the background
+        while buzzer.is_playing():
+            time.sleep(0.05)
     finally:
-        buzzer.close()                    # Ensure the buzzer pin is closed when the program is interrupted
\ No newline at end of file
+        buzzer.close()                    # Ensure the buzzer pin is closed when the program is interrupted
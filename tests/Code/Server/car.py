@@ -3,38 +3,56 @@ from motor import Ordinary_Car
 from servo import Servo
 from infrared import Infrared
 from adc import ADC
+from scan import ServoScanner, SettleModel
+from occupancy import OccupancyGrid
+from heading import HeadingPlanner
+from line_follower import LineFollower
 import time
 import math
 
 class Car:
-    def __init__(self):
+    def __init__(self, async_i2c=False):
+        self.async_i2c = async_i2c # Motor and servo writes go through the PCA9685 worker thread
         self.servo = None
         self.sonic = None
         self.motor = None
         self.infrared = None
         self.adc = None
+        self.scanner = None
+        self.line_follower = None
+        self.grid = OccupancyGrid()                # Sonar evidence around the car, see mode_ultrasonic
+        # Same wheel model as the grid dead reckoning: turning in place at 1450 on both sides
+        self.planner = HeadingPlanner(turn_duty=1450, turn_rate=math.degrees(2 * 1450 * self.grid.cm_per_duty / self.grid.track_width))
+        self.car_turn_end = None                   # End of the planned turn in progress, decisions wait for it
         self.car_record_time = time.time()
-        self.car_sonic_servo_angle = 30
-        self.car_sonic_servo_dir = 1
+        self.car_sonic_angles = range(30, 151, 15) # Bearings swept by the sonar servo
+        self.car_sonic_queue_len = 1               # One ping per reading, a median would mix bearings
         self.car_sonic_distance = [30, 30, 30]
         self.time_compensate = 3 #Depend on your own car,If you want to get the best out of the rotation mode, change the value by experimenting.
         self.start()
     def start(self):  
         if self.servo is None:
-            self.servo = Servo()
+            self.servo = Servo(self.async_i2c)
         if self.sonic is None:
-            self.sonic = Ultrasonic()
+            self.sonic = Ultrasonic(queue_len=self.car_sonic_queue_len)
         if self.motor is None:
-            self.motor = Ordinary_Car()
+            self.motor = Ordinary_Car(self.async_i2c)
         if self.infrared is None:
             self.infrared = Infrared()
         if self.adc is None:
             self.adc = ADC() 
+        if self.scanner is None:
+            settle = SettleModel(sample_time=0.06 * self.car_sonic_queue_len, max_distance=self.sonic.max_distance * 100)
+            self.scanner = ServoScanner(self.servo, self.sonic, self.car_sonic_angles, settle)
+        if self.line_follower is None:
+            self.line_follower = LineFollower(self.motor, self.infrared)
 
     def close(self):
+        self.line_follower.stop()
         self.motor.set_motor_model(0,0,0,0)
         self.sonic.close()
         self.motor.close()
+        self.servo.close()
         self.infrared.close()
         self.adc.close_i2c()
         self.servo = None
@@ -42,15 +60,18 @@ class Car:
         self.motor = None
         self.infrared = None
         self.adc = None
+        self.scanner = None
+        self.line_follower = None
 
     def run_motor_ultrasonic(self, distance):
         if (distance[0] < 30 and distance[1] < 30 and distance[2] <30) or distance[1] < 30 :
             self.motor.set_motor_model(-1450,-1450,-1450,-1450) 
             time.sleep(0.1)   
-            if distance[0] < distance[2]:
-                self.motor.set_motor_model(1450,1450,-1450,-1450)
-            else :
-                self.motor.set_motor_model(-1450,-1450,1450,1450)
+            # Turn towards the widest clear heading instead of just the more open side
+            angle = self.planner.plan(math.degrees(self.grid.heading), min_turn=30)
+            duty, duration = self.planner.turn_command(angle)
+            self.motor.set_motor_model(*duty)
+            self.car_turn_end = time.monotonic() + duration
         elif distance[0] < 30 and distance[1] < 30:
             self.motor.set_motor_model(1500,1500,-1500,-1500)
         elif distance[2] < 30 and distance[1] < 30:
@@ -67,43 +88,30 @@ class Car:
             self.motor.set_motor_model(600,600,600,600)
 
     def mode_ultrasonic(self):
-        if (time.time() - self.car_record_time) > 0.2:
-            self.car_record_time = time.time()
-            self.servo.set_servo_pwm('0', self.car_sonic_servo_angle)
-            if self.car_sonic_servo_angle == 30:
-                self.car_sonic_distance[0] = self.sonic.get_distance()
-            elif self.car_sonic_servo_angle == 90:
-                self.car_sonic_distance[1] = self.sonic.get_distance()
-            elif self.car_sonic_servo_angle == 150:
-                self.car_sonic_distance[2] = self.sonic.get_distance()
+        # Stop a planned turn on time, checked on every pass instead of on the next bearing
+        if self.car_turn_end is not None and time.monotonic() >= self.car_turn_end:
+            self.motor.set_motor_model(0,0,0,0)
+            self.car_turn_end = None
+        # The scanner moves the servo on as soon as a bearing is read, decide on every new bearing
+        index = self.scanner.poll()
+        if index is not None:
+            # Move the grid by what the car did since the last bearing, then fuse the new reading
+            self.grid.step(self.motor.duty)
+            angle, distance = self.scanner.bearings['angle'][index], self.scanner.bearings['distance'][index]
+            self.grid.update(angle, distance)
+            self.planner.observe(90 - angle, distance, math.degrees(self.grid.heading))
+            right, middle, left = self.grid.nearest_per_sector(edges=(-90, -20, 20, 90))
+            self.car_sonic_distance = [min(d, self.grid.max_range) for d in (left, middle, right)]
             #print("L:{}, M:{}, R:{}".format(self.car_sonic_distance[0], self.car_sonic_distance[1], self.car_sonic_distance[2]))
-            self.run_motor_ultrasonic(self.car_sonic_distance)
-            if self.car_sonic_servo_angle <= 30:
-                self.car_sonic_servo_dir = 1
-            elif self.car_sonic_servo_angle >= 150:
-                self.car_sonic_servo_dir = 0
-            if self.car_sonic_servo_dir == 1:
-                self.car_sonic_servo_angle += 60
-            elif self.car_sonic_servo_dir == 0:
-                self.car_sonic_servo_angle -= 60
+            if self.car_turn_end is None:
+                self.run_motor_ultrasonic(self.car_sonic_distance)
 
     def mode_infrared(self):
-        if (time.time() - self.car_record_time) > 0.2:
-            self.car_record_time = time.time()
-            infrared_value = self.infrared.read_all_infrared()
-            #print("infrared_value: " + str(infrared_value))
-            if infrared_value == 2:
-                self.motor.set_motor_model(800,800,800,800)
-            elif infrared_value == 4:
-                self.motor.set_motor_model(-1500,-1500,2500,2500)
-            elif infrared_value == 6:
-                self.motor.set_motor_model(-2000,-2000,4000,4000)
-            elif infrared_value == 1:
-                self.motor.set_motor_model(2500,2500,-1500,-1500)
-            elif infrared_value == 3:
-                self.motor.set_motor_model(4000,4000,-2000,-2000)
-            elif infrared_value == 7:
-                self.motor.set_motor_model(0,0,0,0)
+        # The PID follower runs its own 150 Hz loop woken by the sensor edges, stop it with stop_infrared()
+        self.line_follower.start()
+
+    def stop_infrared(self):
+        self.line_follower.stop()
 
     def mode_light(self):
         if (time.time() - self.car_record_time) > 0.2:
@@ -150,8 +158,9 @@ def test_car_sonic():
 def test_car_infrared():
     car = Car()
     try:
+        car.mode_infrared()
         while True:
-            car.mode_infrared()
+            time.sleep(1)
     except KeyboardInterrupt:
         car.close()
         print("\nEnd of program")
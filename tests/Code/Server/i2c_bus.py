@@ -0,0 +1,219 @@
+import atexit
+import os
+import threading
+import time
+from i2c_trace import I2CTracer
+
+# ============================================================================
+# Process-wide I2C bus registry
+# ============================================================================
+
+class FairLock:
+    """Re-entrant lock handed out in arrival order (ticket lock)."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._next_ticket = 0
+        self._serving = 0
+        self._owner = None
+        self._depth = 0
+        self._abandoned = set()    # Tickets whose waiter gave up, skipped when their turn comes
+        self.wait = 0.0            # s the owner queued for its outermost acquire, until the tracer takes it
+
+    def acquire(self) -> None:
+        """Wait for our turn, the owning thread may re-enter."""
+        me = threading.get_ident()
+        requested = time.perf_counter()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                return
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            try:
+                while ticket != self._serving:
+                    self._cond.wait()
+            except BaseException:
+                # Interrupted in the queue (e.g. KeyboardInterrupt): later tickets must still be served
+                if ticket == self._serving:
+                    self._advance()
+                else:
+                    self._abandoned.add(ticket)
+                raise
+            self._owner = me
+            self._depth = 1
+            self.wait = time.perf_counter() - requested
+
+    def release(self) -> None:
+        """Release one level, the next ticket is served when the owner is done."""
+        with self._cond:
+            if self._owner != threading.get_ident():
+                raise RuntimeError("FairLock released by a thread that does not own it")
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._advance()
+
+    def _advance(self) -> None:
+        # Called with _cond held: serve the next ticket still waiting
+        self._serving += 1
+        while self._serving in self._abandoned:
+            self._abandoned.discard(self._serving)
+            self._serving += 1
+        self._cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class SharedBus:
+    """One SMBus handle shared by every driver on the same bus number.
+
+    Each call is one locked transaction, use transaction() to keep a
+    multi-step register sequence together.
+    """
+
+    def __init__(self, bus_number: int = 1):
+        self.bus_number = bus_number
+        self.lock = FairLock()
+        self.users = 0
+        self.backend = _open_backend(bus_number)
+
+    def transaction(self) -> FairLock:
+        """Context manager holding the bus for several transfers."""
+        return self.lock
+
+    def _call(self, op: str, nbytes: int, method, *args):
+        tracer = _TRACER
+        if tracer is None:
+            with self.lock:
+                return method(*args)
+        with self.lock:
+            start = time.perf_counter()
+            result = method(*args)
+            end = time.perf_counter()
+            # The queueing happened when the transaction was entered, charge it to its first transfer
+            wait, self.lock.wait = self.lock.wait, 0.0
+        tracer.record(op, args[0], nbytes, wait, end - start)
+        return result
+
+    def write_byte(self, address: int, value: int) -> None:
+        self._call('write_byte', 1, self.backend.write_byte, address, value)
+
+    def read_byte(self, address: int) -> int:
+        return self._call('read_byte', 1, self.backend.read_byte, address)
+
+    def write_byte_data(self, address: int, reg: int, value: int) -> None:
+        self._call('write_byte_data', 2, self.backend.write_byte_data, address, reg, value)
+
+    def read_byte_data(self, address: int, reg: int) -> int:
+        return self._call('read_byte_data', 2, self.backend.read_byte_data, address, reg)
+
+    def write_i2c_block_data(self, address: int, reg: int, data: list) -> None:
+        self._call('write_i2c_block_data', len(data) + 1, self.backend.write_i2c_block_data, address, reg, data)
+
+    def read_i2c_block_data(self, address: int, reg: int, length: int) -> list:
+        return self._call('read_i2c_block_data', length + 1, self.backend.read_i2c_block_data, address, reg, length)
+
+    def close(self) -> None:
+        """Drop one user, the handle is closed when the last one leaves."""
+        with _REGISTRY_LOCK:
+            self.users -= 1
+            if self.users > 0:
+                return
+            _BUSES.pop(self.bus_number, None)
+        with self.lock:
+            self.backend.close()
+
+
+# 'smbus' talks to /dev/i2c-*, 'sim' to the register models of sim_bus
+_BACKEND = os.environ.get('ROVER_I2C_BACKEND', 'smbus')
+_BACKEND_OPTIONS = {}
+if 'ROVER_I2C_SIM_LATENCY' in os.environ:
+    _BACKEND_OPTIONS['latency'] = float(os.environ['ROVER_I2C_SIM_LATENCY'])
+
+
+def set_backend(name: str, **options) -> None:
+    """Select the backend of buses opened from now on, options go to SimulatedSMBus."""
+    global _BACKEND, _BACKEND_OPTIONS
+    if name not in ('smbus', 'sim'):
+        raise ValueError(f"Invalid I2C backend: {name}. Valid backends are ['smbus', 'sim'].")
+    _BACKEND = name
+    _BACKEND_OPTIONS = options
+
+
+def enable_tracing(path: str = None, window_size: int = 10000) -> I2CTracer:
+    """Record every transaction of every shared bus, dumped to path as JSON at exit."""
+    global _TRACER
+    if _TRACER is None:
+        _TRACER = I2CTracer(window_size)
+        if path:
+            atexit.register(_TRACER.dump, path)
+    return _TRACER
+
+
+def get_tracer() -> I2CTracer:
+    """The active tracer, None when tracing is off."""
+    return _TRACER
+
+
+def _open_backend(bus_number: int):
+    if _BACKEND == 'sim':
+        from sim_bus import SimulatedSMBus
+        return SimulatedSMBus(bus_number, **_BACKEND_OPTIONS)
+    import smbus
+    return smbus.SMBus(bus_number)
+
+
+_TRACER = None
+if 'ROVER_I2C_TRACE' in os.environ:
+    enable_tracing(os.environ['ROVER_I2C_TRACE'])
+
+_REGISTRY_LOCK = threading.RLock()    # Re-entrant: drivers open their bus while being registered
+_BUSES = {}      # bus number -> SharedBus
+_DEVICES = {}    # (bus number, address) -> [driver, users]
+
+
+def get_bus(bus_number: int = 1) -> SharedBus:
+    """Return the shared handle of a bus, opening it on first use."""
+    with _REGISTRY_LOCK:
+        bus = _BUSES.get(bus_number)
+        if bus is None:
+            bus = _BUSES[bus_number] = SharedBus(bus_number)
+        bus.users += 1
+        return bus
+
+
+def get_device(driver, address: int, bus_number: int = 1):
+    """Return the single driver object for (bus_number, address).
+
+    The driver is built as driver(address, bus_number=bus_number) the first
+    time, so the device is only initialised once per process.
+    """
+    key = (bus_number, address)
+    with _REGISTRY_LOCK:
+        entry = _DEVICES.get(key)
+        if entry is None:
+            entry = _DEVICES[key] = [driver(address, bus_number=bus_number), 0]
+        elif not isinstance(entry[0], driver):
+            raise TypeError(f"I2C device 0x{address:02X} on bus {bus_number} is already a {type(entry[0]).__name__}")
+        entry[1] += 1
+        return entry[0]
+
+
+def release_device(device, bus_number: int, address: int) -> bool:
+    """Drop one user of a device, True when the caller was the last one."""
+    key = (bus_number, address)
+    with _REGISTRY_LOCK:
+        entry = _DEVICES.get(key)
+        if entry is None or entry[0] is not device:
+            return True
+        entry[1] -= 1
+        if entry[1] > 0:
+            return False
+        del _DEVICES[key]
+        return True
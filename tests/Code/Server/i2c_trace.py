@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+from collections import deque
+
+# ============================================================================
+# I2C transaction tracing
+# ============================================================================
+
+class I2CTracer:
+    """Per-transaction latency, size and thread statistics of the shared buses.
+
+    Percentiles and the histogram cover the last window_size transactions,
+    the totals cover the whole run.
+    """
+    # Histogram bucket upper bounds in microseconds, the last one is open ended
+    BUCKETS_US = [50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, float('inf')]
+
+    def __init__(self, window_size: int = 10000):
+        self.started = time.time()
+        self.transactions = 0
+        self.bytes = 0
+        self.threads = {}    # thread name -> [transactions, bus seconds, lock wait seconds]
+        self.ops = {}        # op name -> transactions
+        self._window = deque(maxlen=window_size)    # (end time, bus seconds, lock wait seconds)
+        self._lock = threading.Lock()
+
+    def record(self, op: str, address: int, nbytes: int, wait: float, duration: float) -> None:
+        """Store one transaction: wait is the time spent queued on the bus lock."""
+        thread = threading.current_thread().name
+        with self._lock:
+            self.transactions += 1
+            self.bytes += nbytes
+            self.ops[op] = self.ops.get(op, 0) + 1
+            stats = self.threads.setdefault(thread, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] += wait
+            self._window.append((time.perf_counter(), duration, wait))
+
+    @staticmethod
+    def _percentiles(samples: list) -> dict:
+        if not samples:
+            return {'p50': None, 'p95': None, 'p99': None}
+        samples = sorted(samples)
+        last = len(samples) - 1
+        return {name: samples[round(last * q)] * 1e6 for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))}
+
+    def latency_percentiles(self) -> dict:
+        """p50/p95/p99 of the bus time in microseconds."""
+        with self._lock:
+            return self._percentiles([entry[1] for entry in self._window])
+
+    def wait_percentiles(self) -> dict:
+        """p50/p95/p99 of the lock wait in microseconds, contention shows up here."""
+        with self._lock:
+            return self._percentiles([entry[2] for entry in self._window])
+
+    def histogram(self) -> list:
+        """[(bucket upper bound in us, transactions)] of the bus time."""
+        counts = [0] * len(self.BUCKETS_US)
+        with self._lock:
+            for entry in self._window:
+                us = entry[1] * 1e6
+                for i, bound in enumerate(self.BUCKETS_US):
+                    if us <= bound:
+                        counts[i] += 1
+                        break
+        return list(zip(self.BUCKETS_US, counts))
+
+    def transactions_per_second(self, period: float = 1.0) -> float:
+        """Rate over the last period seconds."""
+        now = time.perf_counter()
+        with self._lock:
+            recent = sum(1 for entry in self._window if now - entry[0] <= period)
+        return recent / period
+
+    def summary(self) -> dict:
+        with self._lock:
+            threads = {name: {'transactions': stats[0], 'bus_ms': stats[1] * 1000, 'wait_ms': stats[2] * 1000}
+                       for name, stats in self.threads.items()}
+            totals = {'transactions': self.transactions, 'bytes': self.bytes, 'ops': dict(self.ops)}
+        totals['elapsed_s'] = time.time() - self.started
+        totals['tps_1s'] = self.transactions_per_second()
+        totals['latency_us'] = self.latency_percentiles()
+        totals['wait_us'] = self.wait_percentiles()
+        totals['histogram_us'] = [['inf' if bound == float('inf') else bound, count] for bound, count in self.histogram()]
+        totals['threads'] = threads
+        return totals
+
+    def dump(self, path: str) -> None:
+        """Write summary() as JSON."""
+        with open(path, 'w') as file:
+            json.dump(self.summary(), file, indent=4)
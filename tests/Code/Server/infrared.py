@@ -1,10 +1,12 @@
 # Import the LineSensor class from gpiozero for reading infrared sensors
 from gpiozero import LineSensor
+from collections import deque
+import threading
 import time
 
 # Define the Infrared class to manage infrared sensors
 class Infrared:
-    def __init__(self):
+    def __init__(self, queue_len: int = 5, sample_rate: float = 100):
         # Define the GPIO pins for each infrared sensor
         self.IR_PINS = {
             1: 14,
@@ -12,12 +14,53 @@ class Infrared:
             3: 23
         }
         # Initialize LineSensor objects for each infrared sensor
-        self.sensors = {channel: LineSensor(pin) for channel, pin in self.IR_PINS.items()}
+        self.sensors = {channel: LineSensor(pin, queue_len=queue_len, sample_rate=sample_rate) for channel, pin in self.IR_PINS.items()}
+        # Packed 3-bit state kept up to date by the sensor callbacks, published as one (bits, time, sequence) tuple
+        self.changes = deque(maxlen=32)            # Recent (bits, time) changes, oldest first
+        self._cond = threading.Condition()         # Serialises the callbacks and wakes wait_for_change()
+        self._state = (self._read_active(), time.monotonic(), 0)
+        for sensor in self.sensors.values():
+            # when_no_line: the sensor output went active (bit set), when_line: it went inactive
+            sensor.when_line = self._changed
+            sensor.when_no_line = self._changed
+
+    def _read_active(self) -> int:
+        bits = 0
+        for channel, sensor in self.sensors.items():
+            if sensor.is_active:
+                bits |= 1 << (3 - channel)
+        return bits
+
+    def _changed(self) -> None:
+        # Runs on the gpiozero queue thread of the sensor that changed
+        t = time.monotonic()
+        with self._cond:
+            bits = self._read_active()
+            if bits == self._state[0]:
+                return
+            self._state = (bits, t, self._state[2] + 1)
+            self.changes.append((bits, t))
+            self._cond.notify_all()
+
+    def state(self) -> tuple:
+        """(packed bits, monotonic time of the last change, change count) without locking."""
+        return self._state
+
+    def wait_for_change(self, sequence: int = None, timeout: float = None) -> tuple:
+        """Block until the change count moves past sequence (default: the current one), returns state().
+
+        On timeout the unchanged state is returned, compare its change count.
+        """
+        with self._cond:
+            if sequence is None:
+                sequence = self._state[2]
+            self._cond.wait_for(lambda: self._state[2] != sequence, timeout)
+            return self._state
 
     def read_one_infrared(self, channel: int) -> int:
         """Read the value of a single infrared sensor."""
         if channel in self.sensors:
-            return 1 if self.sensors[channel].value else 0
+            return 1 if self.sensors[channel].is_active else 0   # Same test as the edge callbacks
         else:
             raise ValueError(f"Invalid channel: {channel}. Valid channels are {list(self.IR_PINS.keys())}.")
 
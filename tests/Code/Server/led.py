@@ -5,8 +5,12 @@ from rpi_ledpixel import Freenove_RPI_WS281X
 from spi_ledpixel import Freenove_SPI_LedPixel
 
 class Led:
-    def __init__(self):
-        """Initialize the Led class and set up LED strip based on PCB and Raspberry Pi versions."""
+    def __init__(self, async_mode: bool = False):
+        """Initialize the Led class and set up LED strip based on PCB and Raspberry Pi versions.
+
+        With async_mode, frames are sent by a transmitter thread and the
+        effects never wait for the strip; turning the LEDs off still waits.
+        """
         # Initialize the ParameterManager instance
         self.param = ParameterManager()
         # Get the Connect version from the parameter file
@@ -17,10 +21,14 @@ class Led:
         # Set up the LED strip based on PCB and Raspberry Pi versions
         if self.connect_version == 1 and self.pi_version == 1:
             self.strip = Freenove_RPI_WS281X(8, 255, 'RGB')
+            if async_mode:
+                self.strip.enable_async()    # Effects keep drawing while the frame is sent
             self.is_support_led_function = True
 
         elif self.connect_version == 2 and (self.pi_version == 1 or self.pi_version == 2):
             self.strip = Freenove_SPI_LedPixel(8, 255, 'GRB')
+            if async_mode:
+                self.strip.enable_async()    # Effects keep drawing while the frame is sent
             self.is_support_led_function = True
 
         elif self.connect_version == 1 and self.pi_version == 2:
@@ -52,6 +60,7 @@ class Led:
             else:
                 self.strip.set_all_led_color(0, 0, 0)
                 self.strip.show()
+                self.strip.flush()    # The off frame must reach the strip before an exit
 
     def wheel(self, pos):
         """Generate rainbow colors across 0-255 positions."""
@@ -0,0 +1,186 @@
+import threading
+import time
+
+class LineFollower:
+    """PID line follower for Ordinary_Car driven by the three infrared sensors.
+
+    The line position error (-1 line under the left sensor, +1 under the
+    right one) comes from the packed sensor state and is blended over
+    blend seconds after each change, so it moves continuously instead of
+    jumping between the six sensor patterns. A background loop runs at
+    rate Hz and also wakes on every sensor change; motors are only written
+    when the quantized output changes. When the line is lost for longer
+    than lost_time the car spins towards the side the line was last seen,
+    reversing with a wider sweep every time the search span runs out.
+    """
+    # Line position for each packed state (bit 2 = left sensor, bit 0 = right sensor)
+    POSITION = {
+        0b100: -1.0,
+        0b110: -0.5,
+        0b010: 0.0,
+        0b011: 0.5,
+        0b001: 1.0,
+        0b101: 0.0,
+        0b111: 0.0,
+    }
+    LOST_POSITION = 1.5          # Line beyond the outer sensor on the side it was last seen
+
+    def __init__(self, motor, infrared, rate: float = 150.0, base_duty: int = 1200,
+                 kp: float = 1500.0, ki: float = 300.0, kd: float = 60.0, output_limit: float = 2500.0,
+                 corner_slowdown: float = 0.5, blend: float = 0.03, quantum: int = 20,
+                 lost_time: float = 0.3, search_duty: int = 1200, search_span: float = 0.6,
+                 stop_on_marker: bool = True):
+        self.motor = motor
+        self.infrared = infrared
+        self.period = 1.0 / rate
+        self.base_duty = base_duty
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_limit = output_limit      # |steering| in duty units
+        self.corner_slowdown = corner_slowdown  # Share of base_duty dropped at full error
+        self.blend = blend                    # s to move the error from the old to the new position
+        self.quantum = quantum                # Duty step, smaller output changes are not written
+        self.lost_time = lost_time            # s
+        self.search_duty = search_duty
+        self.search_span = search_span        # s of the first search sweep, doubled on every reversal
+        self.stop_on_marker = stop_on_marker  # All three sensors on the line: stop, like the original mode
+        self.writes = 0
+        self.iterations = 0
+        self._sent = None
+        self._stop = None                     # Stop event of the running thread, each thread gets its own
+        self._thread = None
+        self._lock = threading.Lock()         # start() and stop() come from the car and command threads
+        self.reset()
+
+    def reset(self) -> None:
+        self.integral = 0.0
+        self.error = 0.0
+        self._previous = None                 # (time, error) of the last iteration
+        self._derivative = 0.0
+        self._from = 0.0                      # Error when the current sensor state started
+        self._sequence = None                 # Change count of that state
+        self._last_side = 1.0
+        self._search = None                   # (direction, end time, span) while searching
+
+    def position(self, bits: int, since: float, now: float) -> float:
+        """Blended line position for a state that started at since."""
+        target = self.POSITION.get(bits)
+        if target is None:
+            target = self.LOST_POSITION * self._last_side
+        weight = min(max((now - since) / self.blend, 0.0), 1.0) if self.blend > 0 else 1.0
+        return self._from + (target - self._from) * weight
+
+    def pid(self, error: float, now: float) -> float:
+        """Steering output in duty units, positive turns right."""
+        dt = self.period if self._previous is None else max(now - self._previous[0], 1e-4)
+        if self._previous is not None:
+            # Low-passed derivative, one sensor edge must not kick the wheels
+            raw = (error - self._previous[1]) / dt
+            self._derivative += (raw - self._derivative) * min(dt / 0.02, 1.0)
+        self._previous = (now, error)
+        p = self.kp * error
+        d = self.kd * self._derivative
+        integral = self.integral + error * dt
+        output = p + self.ki * integral + d
+        # Anti-windup: only keep integrating while the output is not saturated in the same direction
+        if abs(output) <= self.output_limit or error * output < 0:
+            self.integral = integral
+        output = p + self.ki * self.integral + d
+        return max(-self.output_limit, min(self.output_limit, output))
+
+    def step(self, state: tuple = None, now: float = None) -> tuple:
+        """One control iteration from an Infrared.state() tuple, returns the duties in effect."""
+        if now is None:
+            now = time.monotonic()
+        bits, since, sequence = self.infrared.state() if state is None else state
+        self.iterations += 1
+        if sequence != self._sequence:
+            # Blend from wherever the error was when the sensors changed
+            self._from = self.error
+            self._sequence = sequence
+        if bits == 0 and now - since >= self.lost_time:
+            duties = self._search_step(now)
+        elif bits == 0b111 and self.stop_on_marker:
+            duties = (0, 0, 0, 0)
+        else:
+            if self._search is not None:
+                # Line found again: start clean instead of unwinding the search
+                self._search = None
+                self.integral = 0.0
+                self._previous = None
+            error = self.position(bits, since, now)
+            if bits in self.POSITION and self.POSITION[bits] != 0:
+                self._last_side = 1.0 if self.POSITION[bits] > 0 else -1.0
+            self.error = error
+            steering = self.pid(error, now)
+            base = self.base_duty * (1.0 - self.corner_slowdown * min(abs(error), 1.0))
+            left = self._quantize(base + steering)
+            right = self._quantize(base - steering)
+            duties = (left, left, right, right)
+        self._write(duties)
+        return duties
+
+    def _search_step(self, now: float) -> tuple:
+        if self._search is None:
+            self._search = (self._last_side, now + self.search_span, self.search_span)
+        direction, end, span = self._search
+        if now >= end:
+            span *= 2
+            direction = -direction
+            self._search = (direction, now + span, span)
+        d = int(self.search_duty * direction)
+        return (d, d, -d, -d)                  # Spin in place, positive direction turns right
+
+    def _quantize(self, duty: float) -> int:
+        return int(round(duty / self.quantum)) * self.quantum
+
+    def _write(self, duties: tuple) -> None:
+        if duties != self._sent:
+            self.motor.set_motor_model(*duties)
+            self._sent = duties
+            self.writes += 1
+
+    def _run(self, stop: threading.Event) -> None:
+        next_tick = time.monotonic()
+        while True:
+            state = self.infrared.state()
+            with self._lock:
+                # Checked under the lock: once stop() returns this thread writes no more duties
+                if stop.is_set():
+                    break
+                self.step(state)
+            next_tick += self.period
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                # Sleep until the next tick, or less if a sensor changes meanwhile
+                if self.infrared.wait_for_change(state[2], timeout=delay)[2] != state[2]:
+                    next_tick = time.monotonic()
+            else:
+                next_tick = time.monotonic()    # Overrun: do not try to catch up
+
+    def start(self) -> None:
+        """Start the control loop, does nothing if it is already running."""
+        with self._lock:
+            if self._thread is None:
+                self.reset()
+                self._sent = None
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,), name="line_follower", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the control loop, the wheels keep their last duty.
+
+        The thread is signalled but not joined: the caller waits at most for
+        the iteration in progress, and the thread exits at its next wake-up
+        without writing again, even if start() already launched a new one.
+        """
+        with self._lock:
+            if self._stop is not None:
+                self._stop.set()
+            self._stop = None
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None
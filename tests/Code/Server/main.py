@@ -40,8 +40,8 @@ class mywindow(QMainWindow, Ui_server_ui):
     def config_task(self):
         self.tcp_server = Server()
         self.command = Command()
-        self.led = Led()
-        self.car = Car()
+        self.led = Led(async_mode=True)  # The off frame of colorBlink(0) is flushed before returning
+        self.car = Car(async_i2c=True)  # Joystick commands must not wait for the I2C bus
         self.buzzer = Buzzer()
         self.camera = Camera(stream_size=(400, 300))
         self.queue_cmd = multiprocessing.Queue()
@@ -66,6 +66,17 @@ class mywindow(QMainWindow, Ui_server_ui):
         self.send_line_data_time = time.time()
         self.led_mode = 0
 
+    @property
+    def car_mode(self):
+        return self._car_mode
+
+    @car_mode.setter
+    def car_mode(self, mode):
+        self._car_mode = mode
+        # Leaving the infrared mode: stop the line follower before the next command drives the motors
+        if mode != 3:
+            self.car.stop_infrared()
+
     def stop_car(self):
         self.led.colorBlink(0)
         self.camera.stop_stream()
@@ -276,6 +287,8 @@ class mywindow(QMainWindow, Ui_server_ui):
 
     def threading_car_task(self):
         while self.car_thread_is_running:
+            if self.car_mode != 3:
+                self.car.stop_infrared()   # In case it was restarted while the mode changed
             if self.car_mode == 1:
                 pass
             elif self.car_mode == 2:
@@ -287,6 +300,7 @@ class mywindow(QMainWindow, Ui_server_ui):
                 self.car.mode_ultrasonic()
                 self.send_sonic_data()
             time.sleep(0.01)
+        self.car.stop_infrared()
 
 
     def set_threading_video_send(self, state, close_time=0.3):
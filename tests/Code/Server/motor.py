@@ -1,10 +1,15 @@
 import time
 from pca9685 import PCA9685
+from i2c_bus import get_device
 
 class Ordinary_Car:
-    def __init__(self):
-        self.pwm = PCA9685(0x40, debug=True)
+    def __init__(self, async_mode: bool = False):
+        self.pwm = get_device(PCA9685, 0x40)    # Shared with any other user of the chip
         self.pwm.set_pwm_freq(50)
+        self.duty = (0, 0, 0, 0)                # Last commanded wheel duties, for dead reckoning
+        if async_mode:
+            # set_motor_model() only posts the frame, the PCA9685 worker writes the latest one
+            self.pwm.enable_async()
     def duty_range(self, duty1, duty2, duty3, duty4):
         if duty1 > 4095:
             duty1 = 4095
@@ -23,52 +28,64 @@ class Ordinary_Car:
         elif duty4 < -4095:
             duty4 = -4095
         return duty1,duty2,duty3,duty4
-    def left_upper_wheel(self,duty):
+    # (channel driven low, channel driven with the duty) for positive duty, per wheel
+    WHEEL_CHANNELS = {
+        'left_upper': (0, 1),
+        'left_lower': (3, 2),
+        'right_upper': (6, 7),
+        'right_lower': (4, 5),
+    }
+    def wheel_frame(self, frame, wheel, duty):
+        """Fill the two channel duties of one wheel in an 8-channel frame."""
+        ch_a, ch_b = self.WHEEL_CHANNELS[wheel]
         if duty>0:
-            self.pwm.set_motor_pwm(0,0)
-            self.pwm.set_motor_pwm(1,duty)
+            frame[ch_a] = 0
+            frame[ch_b] = duty
         elif duty<0:
-            self.pwm.set_motor_pwm(1,0)
-            self.pwm.set_motor_pwm(0,abs(duty))
+            frame[ch_b] = 0
+            frame[ch_a] = abs(duty)
         else:
-            self.pwm.set_motor_pwm(0,4095)
-            self.pwm.set_motor_pwm(1,4095)
+            frame[ch_a] = 4095
+            frame[ch_b] = 4095
+        return frame
+    def set_wheel(self, wheel, duty):
+        ch_a, ch_b = sorted(self.WHEEL_CHANNELS[wheel])
+        frame = self.wheel_frame([0] * 8, wheel, duty)
+        self.pwm.set_pwm_range(ch_a, [(0, frame[ch_a]), (0, frame[ch_b])])
+    def left_upper_wheel(self,duty):
+        self.set_wheel('left_upper', duty)
     def left_lower_wheel(self,duty):
-        if duty>0:
-            self.pwm.set_motor_pwm(3,0)
-            self.pwm.set_motor_pwm(2,duty)
-        elif duty<0:
-            self.pwm.set_motor_pwm(2,0)
-            self.pwm.set_motor_pwm(3,abs(duty))
-        else:
-            self.pwm.set_motor_pwm(2,4095)
-            self.pwm.set_motor_pwm(3,4095)
+        self.set_wheel('left_lower', duty)
     def right_upper_wheel(self,duty):
-        if duty>0:
-            self.pwm.set_motor_pwm(6,0)
-            self.pwm.set_motor_pwm(7,duty)
-        elif duty<0:
-            self.pwm.set_motor_pwm(7,0)
-            self.pwm.set_motor_pwm(6,abs(duty))
-        else:
-            self.pwm.set_motor_pwm(6,4095)
-            self.pwm.set_motor_pwm(7,4095)
+        self.set_wheel('right_upper', duty)
     def right_lower_wheel(self,duty):
-        if duty>0:
-            self.pwm.set_motor_pwm(4,0)
-            self.pwm.set_motor_pwm(5,duty)
-        elif duty<0:
-            self.pwm.set_motor_pwm(5,0)
-            self.pwm.set_motor_pwm(4,abs(duty))
-        else:
-            self.pwm.set_motor_pwm(4,4095)
-            self.pwm.set_motor_pwm(5,4095)
+        self.set_wheel('right_lower', duty)
+    def motor_frame(self, duty1, duty2, duty3, duty4):
+        """Duties of channels 0-7 for the four wheels."""
+        frame = [0] * 8
+        self.wheel_frame(frame, 'left_upper', duty1)
+        self.wheel_frame(frame, 'left_lower', duty2)
+        self.wheel_frame(frame, 'right_upper', duty3)
+        self.wheel_frame(frame, 'right_lower', duty4)
+        return frame
     def set_motor_model(self, duty1, duty2, duty3, duty4):
         duty1,duty2,duty3,duty4=self.duty_range(duty1,duty2,duty3,duty4)
-        self.left_upper_wheel(duty1)
-        self.left_lower_wheel(duty2)
-        self.right_upper_wheel(duty3)
-        self.right_lower_wheel(duty4)
+        # All 8 channels in one 32-byte block (registers 0x06-0x25), every wheel changes at once
+        frame = self.motor_frame(duty1, duty2, duty3, duty4)
+        self.pwm.set_pwm_range(0, [(0, duty) for duty in frame])
+        self.duty = (duty1, duty2, duty3, duty4)
+
+    def emergency_brake(self):
+        """Brake every wheel at once, ahead of any frame still queued for the worker.
+
+        Same output state as set_motor_model(0,0,0,0) in one block write of
+        channels 0-7. The ALL_LED broadcast is not used: it would also drive
+        the servo channels 8-15 fully on.
+        """
+        if self.pwm.worker is not None:
+            self.pwm.worker.discard()    # Older posted frames must not undo the brake
+        self.pwm.write_pwm_range(0, [(0, 4095)] * 8)
+        self.duty = (0, 0, 0, 0)
 
     def close(self):
         self.set_motor_model(0,0,0,0)
@@ -0,0 +1,131 @@
+import math
+import time
+import numpy
+
+class OccupancyGrid:
+    """Rolling log-odds occupancy grid around the car, built from sonar readings.
+
+    The grid is world-aligned and scrolls by whole cells to keep the car
+    near its centre; the car pose (x, y in cm from the centre, heading in
+    rad) is dead-reckoned from the commanded wheel duties. Bearings are
+    relative to the car heading, positive to the left, so servo angle a
+    looks along 90 - a degrees. Log-odds decay towards 0 (unknown) with
+    time constant tau.
+    """
+    def __init__(self, size: float = 300.0, resolution: float = 5.0, max_range: float = 200.0,
+                 beam_width: float = 15.0, hit: float = 0.85, miss: float = -0.4, limit: float = 5.0,
+                 tau: float = 5.0, cm_per_duty: float = 0.02, track_width: float = 14.0):
+        self.resolution = resolution                  # cm per cell
+        self.cells = int(round(size / resolution))
+        self.max_range = max_range                    # cm, readings at or beyond it carry no hit
+        self.hit = hit                                # Log-odds added to cells at the measured range
+        self.miss = miss                              # Log-odds added to cells the beam went through
+        self.limit = limit                            # Log-odds saturation, keeps the grid able to change
+        self.tau = tau                                # s
+        self.cm_per_duty = cm_per_duty                # cm/s of wheel speed per duty unit, measure it on your car
+        self.track_width = track_width                # cm between left and right wheels
+        self.grid = numpy.zeros((self.cells, self.cells), dtype=numpy.float32)  # [row = y, column = x]
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = math.pi / 2                    # Car looks along +y
+        self.t = None
+        # Beam samples in the car frame: sub-rays across the cone x ranges every half cell
+        half = math.radians(beam_width) / 2
+        self._beam_angles = numpy.linspace(-half, half, max(3, int(beam_width / 5) + 1))[:, None]
+        self._beam_ranges = numpy.arange(resolution / 2, max_range + resolution, resolution / 2)[None, :]
+        # Cell centres relative to the grid centre, for the sector queries
+        centres = (numpy.arange(self.cells) - (self.cells - 1) / 2) * resolution
+        self._cx, self._cy = numpy.meshgrid(centres, centres)
+
+    def _index(self, x, y):
+        """Flat cell indices of world points (cm from the grid centre), -1 outside the grid."""
+        col = numpy.floor(x / self.resolution + self.cells / 2).astype(numpy.intp)
+        row = numpy.floor(y / self.resolution + self.cells / 2).astype(numpy.intp)
+        inside = (col >= 0) & (col < self.cells) & (row >= 0) & (row < self.cells)
+        return numpy.where(inside, row * self.cells + col, -1)
+
+    def update(self, angle: float, distance: float) -> None:
+        """Fuse one reading: servo angle in degrees, distance in cm (None or NaN for no echo)."""
+        if distance is None or math.isnan(distance):
+            distance = self.max_range
+        distance = min(distance, self.max_range)
+        bearing = self.heading + math.radians(90 - angle) + self._beam_angles
+        ranges = numpy.broadcast_to(self._beam_ranges, (bearing.shape[0], self._beam_ranges.shape[1]))
+        cells = self._index(self.x + ranges * numpy.cos(bearing), self.y + ranges * numpy.sin(bearing))
+        free = numpy.unique(cells[(ranges < distance - self.resolution) & (cells >= 0)])
+        flat = self.grid.reshape(-1)
+        if distance < self.max_range:
+            hit = numpy.unique(cells[(numpy.abs(ranges - distance) <= self.resolution / 2) & (cells >= 0)])
+            free = numpy.setdiff1d(free, hit, assume_unique=True)
+            flat[hit] += self.hit
+        flat[free] += self.miss
+        numpy.clip(self.grid, -self.limit, self.limit, out=self.grid)
+
+    def decay(self, dt: float) -> None:
+        self.grid *= math.exp(-dt / self.tau)
+
+    def move(self, duties, dt: float) -> None:
+        """Dead-reckon dt seconds of the commanded (left upper, left lower, right upper, right lower) duties."""
+        left = (duties[0] + duties[1]) / 2 * self.cm_per_duty
+        right = (duties[2] + duties[3]) / 2 * self.cm_per_duty
+        speed = (left + right) / 2
+        self.heading = (self.heading + (right - left) / self.track_width * dt) % (2 * math.pi)
+        self.x += speed * math.cos(self.heading) * dt
+        self.y += speed * math.sin(self.heading) * dt
+        # Scroll by whole cells once the car is more than a cell away from the centre
+        shift_x = int(self.x / self.resolution)
+        shift_y = int(self.y / self.resolution)
+        if shift_x or shift_y:
+            self.grid = self._shift(self.grid, shift_y, shift_x)
+            self.x -= shift_x * self.resolution
+            self.y -= shift_y * self.resolution
+
+    @staticmethod
+    def _shift(grid, rows: int, cols: int):
+        """Move the content by -rows, -cols cells, what scrolls in is unknown."""
+        shifted = numpy.zeros_like(grid)
+        n_rows, n_cols = grid.shape
+        if abs(rows) < n_rows and abs(cols) < n_cols:
+            src_r = slice(max(rows, 0), n_rows + min(rows, 0))
+            dst_r = slice(max(-rows, 0), n_rows + min(-rows, 0))
+            src_c = slice(max(cols, 0), n_cols + min(cols, 0))
+            dst_c = slice(max(-cols, 0), n_cols + min(-cols, 0))
+            shifted[dst_r, dst_c] = grid[src_r, src_c]
+        return shifted
+
+    def step(self, duties, now: float = None) -> None:
+        """decay() and move() for the time since the previous call."""
+        if now is None:
+            now = time.monotonic()
+        if self.t is not None:
+            dt = now - self.t
+            self.decay(dt)
+            self.move(duties, dt)
+        self.t = now
+
+    def _occupied(self, threshold: float):
+        """Range and bearing (car frame, rad in -pi..pi) of the cells above threshold."""
+        cells = numpy.flatnonzero(self.grid > threshold)
+        dx = self._cx.reshape(-1)[cells] - self.x
+        dy = self._cy.reshape(-1)[cells] - self.y
+        bearing = (numpy.arctan2(dy, dx) - self.heading + math.pi) % (2 * math.pi) - math.pi
+        return numpy.hypot(dx, dy), bearing
+
+    def nearest_per_sector(self, edges=(-90, -20, 20, 90), threshold: float = 0.5) -> list:
+        """Distance to the nearest occupied cell between consecutive edge bearings (degrees), inf if none."""
+        ranges, bearing = self._occupied(threshold)
+        sector = numpy.digitize(bearing, numpy.radians(edges))
+        nearest = numpy.full(len(edges) + 1, numpy.inf)
+        numpy.minimum.at(nearest, sector, ranges)
+        return nearest[1:len(edges)].tolist()
+
+    def free_distance(self, bearing: float = 0.0, half_width: float = 15.0, threshold: float = 0.5) -> float:
+        """Distance to the nearest occupied cell inside a cone (degrees), inf if it is clear."""
+        ranges, cell_bearing = self._occupied(threshold)
+        inside = numpy.abs((cell_bearing - math.radians(bearing) + math.pi) % (2 * math.pi) - math.pi) <= math.radians(half_width)
+        return float(ranges[inside].min()) if inside.any() else math.inf
+
+    def cone_free(self, bearing: float = 0.0, half_width: float = 15.0, distance: float = 30.0,
+                  threshold: float = 0.5) -> bool:
+        """True when nothing occupied lies within distance cm inside the cone."""
+        return self.free_distance(bearing, half_width, threshold) > distance
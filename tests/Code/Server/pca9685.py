@@ -2,7 +2,8 @@
 
 import time
 import math
-import smbus
+from i2c_bus import get_bus, release_device
+from pwm_worker import PWMWorker
 
 # ============================================================================
 # Raspi PCA9685 16-Channel PWM Servo Driver
@@ -24,21 +25,72 @@ class PCA9685:
     __ALLLED_OFF_L       = 0xFC
     __ALLLED_OFF_H       = 0xFD
 
-    def __init__(self, address: int = 0x40, debug: bool = False):
-        self.bus = smbus.SMBus(1)
+    # MODE1 bits
+    __MODE1_AI           = 0x20    # Register auto-increment
+    __MODE1_SLEEP        = 0x10
+    __MODE1_RESTART      = 0x80
+
+    # SMBus block writes carry at most 32 data bytes (8 channels)
+    __BLOCK_MAX          = 32
+
+    def __init__(self, address: int = 0x40, debug: bool = False, bus_number: int = 1):
+        # Shared handle, get_device(PCA9685, address) also shares the driver itself
+        self.bus = get_bus(bus_number)
+        self.bus_number = bus_number
         self.address = address
         self.debug = debug
-        self.write(self.__MODE1, 0x00)
-    
+        self.cache_hits = 0      # Writes skipped because the chip already holds the value
+        self.cache_misses = 0    # Writes sent to the bus
+        self.worker = None       # PWMWorker once enable_async() is called
+        self.invalidate()
+        self.write(self.__MODE1, self.__MODE1_AI)
+
+    def invalidate(self) -> None:
+        """Forget the shadow copy of the registers, e.g. after a chip reset."""
+        self._shadow = [None] * 256
+
+    def _remember(self, reg: int, value: int) -> None:
+        # RESTART clears itself on the chip once the oscillator is running again
+        self._shadow[reg] = value & ~self.__MODE1_RESTART if reg == self.__MODE1 else value
+
     def write(self, reg: int, value: int) -> None:
         """Writes an 8-bit value to the specified register/address."""
-        self.bus.write_byte_data(self.address, reg, value)
-      
+        with self.bus.transaction():
+            if self._shadow[reg] == value:
+                self.cache_hits += 1
+                return
+            self.bus.write_byte_data(self.address, reg, value)
+            self._remember(reg, value)
+            self.cache_misses += 1
+
+    def write_block(self, reg: int, data: list) -> None:
+        """Writes consecutive registers starting at reg, relies on MODE1 auto-increment.
+
+        Only the span between the first and last byte that differ from the
+        shadow registers is sent, an unchanged block costs no bus traffic.
+        """
+        with self.bus.transaction():
+            for start in range(0, len(data), self.__BLOCK_MAX):
+                chunk = data[start:start + self.__BLOCK_MAX]
+                base = reg + start
+                changed = [i for i, value in enumerate(chunk) if self._shadow[base + i] != value]
+                if not changed:
+                    self.cache_hits += 1
+                    continue
+                first, last = changed[0], changed[-1] + 1
+                if first == last - 1:
+                    self.bus.write_byte_data(self.address, base + first, chunk[first])
+                else:
+                    self.bus.write_i2c_block_data(self.address, base + first, chunk[first:last])
+                for i in range(first, last):
+                    self._remember(base + i, chunk[i])
+                self.cache_misses += 1
+
     def read(self, reg: int) -> int:
         """Read an unsigned byte from the I2C device."""
         result = self.bus.read_byte_data(self.address, reg)
         return result
-    
+
     def set_pwm_freq(self, freq: float) -> None:
         """Sets the PWM frequency."""
         prescaleval = 25000000.0    # 25MHz
@@ -47,21 +99,77 @@ class PCA9685:
         prescaleval -= 1.0
         prescale = math.floor(prescaleval + 0.5)
 
-        oldmode = self.read(self.__MODE1)
-        newmode = (oldmode & 0x7F) | 0x10        # sleep
-        self.write(self.__MODE1, newmode)        # go to sleep
-        self.write(self.__PRESCALE, int(math.floor(prescale)))
-        self.write(self.__MODE1, oldmode)
-        time.sleep(0.005)
-        self.write(self.__MODE1, oldmode | 0x80)
+        # Held for the whole sleep/prescale/restart sequence so no other user re-programs it halfway
+        with self.bus.transaction():
+            if self._shadow[self.__PRESCALE] == prescale:
+                self.cache_hits += 1
+                return
+            oldmode = self._shadow[self.__MODE1]
+            if oldmode is None:
+                oldmode = self.read(self.__MODE1)
+            oldmode |= self.__MODE1_AI
+            newmode = (oldmode & 0x7F) | self.__MODE1_SLEEP   # sleep
+            self.write(self.__MODE1, newmode)        # go to sleep
+            self.write(self.__PRESCALE, int(math.floor(prescale)))
+            self.write(self.__MODE1, oldmode)
+            time.sleep(0.005)
+            self.write(self.__MODE1, oldmode | self.__MODE1_RESTART)
 
+    @staticmethod
+    def _pwm_bytes(on: int, off: int) -> list:
+        """Register layout of one channel: ON_L, ON_H, OFF_L, OFF_H."""
+        return [on & 0xFF, on >> 8, off & 0xFF, off >> 8]
+
+    def enable_async(self) -> PWMWorker:
+        """Hand channel writes to a background thread, set_pwm*() return immediately."""
+        if self.worker is None:
+            self.worker = PWMWorker(self)
+        return self.worker
+
+    def flush(self, timeout: float = None) -> bool:
+        """In async mode wait until every posted value has been written."""
+        if self.worker is None:
+            return True
+        return self.worker.flush(timeout)
 
     def set_pwm(self, channel: int, on: int, off: int) -> None:
-        """Sets a single PWM channel."""
-        self.write(self.__LED0_ON_L + 4 * channel, on & 0xFF)
-        self.write(self.__LED0_ON_H + 4 * channel, on >> 8)
-        self.write(self.__LED0_OFF_L + 4 * channel, off & 0xFF)
-        self.write(self.__LED0_OFF_H + 4 * channel, off >> 8)
+        """Sets a single PWM channel in one 4-byte transaction."""
+        self.set_pwm_range(channel, [(on, off)])
+
+    def set_pwm_range(self, first_channel: int, values: list) -> None:
+        """Sets adjacent channels starting at first_channel from a list of (on, off) pairs.
+
+        Up to 8 channels go out in a single transaction, longer runs are split.
+        In async mode the values are posted to the worker instead.
+        """
+        if self.worker is not None and not self.worker.is_worker_thread():
+            self.worker.post(first_channel, list(values))
+        else:
+            self.write_pwm_range(first_channel, values)
+
+    def write_pwm_range(self, first_channel: int, values: list) -> None:
+        """Synchronous part of set_pwm_range()."""
+        data = []
+        for on, off in values:
+            data.extend(self._pwm_bytes(on, off))
+        self.write_block(self.__LED0_ON_L + 4 * first_channel, data)
+
+    def set_all_pwm(self, on: int, off: int) -> None:
+        """Sets all 16 channels at once through the ALL_LED registers, one 4-byte transaction."""
+        data = self._pwm_bytes(on, off)
+        if self.worker is not None:
+            self.worker.discard()    # Older posted values must not undo the broadcast
+        with self.bus.transaction():
+            self.bus.write_i2c_block_data(self.address, self.__ALLLED_ON_L, data)
+            self.cache_misses += 1
+            for channel in range(16):
+                for i in range(4):
+                    self._shadow[self.__LED0_ON_L + 4 * channel + i] = data[i]
+
+    def broadcast_stop(self) -> None:
+        """Drives every output fully off (OFF bit 12) in a single write."""
+        self.set_all_pwm(0, 0x1000)
+
     def set_motor_pwm(self, channel: int, duty: int) -> None:
         """Sets the PWM duty cycle for a motor."""
         self.set_pwm(channel, 0, duty)
@@ -72,11 +180,13 @@ class PCA9685:
         self.set_pwm(channel, 0, int(pulse))
 
     def close(self) -> None:
-        """Close the I2C bus."""
-        self.bus.close()
+        """Close the I2C bus once the last user of this driver is done."""
+        if release_device(self, self.bus_number, self.address):
+            if self.worker is not None:
+                self.worker.close()
+                self.worker = None
+            self.bus.close()
 
 
 if __name__=='__main__':
     pass
-    
-      
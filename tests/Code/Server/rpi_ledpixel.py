@@ -1,9 +1,16 @@
 import time
-from rpi_ws281x import Adafruit_NeoPixel, Color
+import numpy
+from rpi_ws281x import Adafruit_NeoPixel
+from led_transmitter import FrameTransmitter
 
-class Freenove_RPI_WS281X:
+class Freenove_RPI_WS281X(FrameTransmitter):
     def __init__(self, led_count: int = 4, brightness: int = 255, sequence: str = "RGB"):
         """Initialize the LED strip with default parameters."""
+        self.led_version = 0              # Bumped on every color change, show() skips frames already sent
+        self.led_sent_version = None
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.init_transmitter()           # Double-buffered mode, see enable_async()
         self.set_led_type(sequence)
         self.set_led_count(led_count)
         self.set_led_brightness(brightness)
@@ -24,12 +31,15 @@ class Freenove_RPI_WS281X:
     def led_close(self) -> None:
         """Turn off all LEDs."""
         self.set_all_led_rgb([0, 0, 0])
+        self.stop_transmitter()
 
     def set_led_count(self, count: int) -> None:
         """Set the number of LEDs in the strip."""
         self.led_count = count
-        self.led_color = [0, 0, 0] * self.led_count
-        self.led_original_color = [0, 0, 0] * self.led_count
+        self.led_version += 1
+        # Colors as given (R, G, B) and as sent (strip order, brightness applied)
+        self.led_original_color = numpy.zeros((self.led_count, 3), dtype=numpy.uint8)
+        self.led_color = numpy.zeros((self.led_count, 3), dtype=numpy.uint8)
 
     def get_led_count(self) -> int:
         """Get the number of LEDs in the strip."""
@@ -44,30 +54,57 @@ class Freenove_RPI_WS281X:
             self.led_red_offset = (led_type_offset[index] >> 4) & 0x03
             self.led_green_offset = (led_type_offset[index] >> 2) & 0x03
             self.led_blue_offset = (led_type_offset[index] >> 0) & 0x03
-            return index
         except ValueError:
             self.led_red_offset = 1
             self.led_green_offset = 0
             self.led_blue_offset = 2
-            return -1
+            index = -1
+        # Permutation index: strip channel k carries color channel led_order[k]
+        self.led_order = numpy.zeros(3, dtype=numpy.intp)
+        self.led_order[[self.led_red_offset, self.led_green_offset, self.led_blue_offset]] = [0, 1, 2]
+        if hasattr(self, 'led_color'):
+            self.update_led_color()
+        return index
 
     def set_led_brightness(self, brightness: int) -> None:
-        """Set the brightness of the LEDs."""
+        """Set the brightness of the LEDs through a scale table applied to the whole frame."""
         self.led_brightness = brightness
-        for i in range(self.get_led_count()):
-            self.set_led_rgb_data(i, self.led_original_color)
+        self.led_scale = numpy.round(numpy.arange(256) * brightness / 255).astype(numpy.uint8)
+        self.update_led_color()
+
+    def update_led_color(self, rows=slice(None)) -> None:
+        """Rebuild the sent colors of the given LEDs (index, slice or index array) with one gather."""
+        color = self.led_scale[self.led_original_color[rows][..., self.led_order]]
+        if not numpy.array_equal(color, self.led_color[rows]):
+            self.led_color[rows] = color
+            self.led_version += 1
 
     def set_led_pixel(self, index: int, r: int, g: int, b: int) -> None:
         """Set the color of a specific LED."""
-        p = [0, 0, 0]
-        p[self.led_red_offset] = round(r * self.led_brightness / 255)
-        p[self.led_green_offset] = round(g * self.led_brightness / 255)
-        p[self.led_blue_offset] = round(b * self.led_brightness / 255)
-        self.led_original_color[index * 3 + self.led_red_offset] = r
-        self.led_original_color[index * 3 + self.led_green_offset] = g
-        self.led_original_color[index * 3 + self.led_blue_offset] = b
-        for i in range(3):
-            self.led_color[index * 3 + i] = p[i]
+        self.led_original_color[index] = (r, g, b)
+        self.update_led_color(index)
+
+    def set_frame(self, frame) -> None:
+        """Set every LED from an (N, 3) array-like of R, G, B values."""
+        self.led_original_color[:] = frame
+        self.update_led_color()
+
+    def fill(self, color) -> None:
+        """Set every LED to the same [R, G, B] color."""
+        self.led_original_color[:] = color
+        self.update_led_color()
+
+    def __len__(self) -> int:
+        return self.led_count
+
+    def __getitem__(self, key):
+        """strip[i] or strip[a:b]: colors as given, R, G, B."""
+        return self.led_original_color[key]
+
+    def __setitem__(self, key, color) -> None:
+        """strip[a:b] = color or (M, 3) colors, shown on the next show()."""
+        self.led_original_color[key] = color
+        self.update_led_color(key)
 
     def set_led_color_data(self, index: int, r: int, g: int, b: int) -> None:
         """Set the color data of a specific LED."""
@@ -89,34 +126,48 @@ class Freenove_RPI_WS281X:
 
     def set_all_led_color_data(self, r: int, g: int, b: int) -> None:
         """Set the color data of all LEDs."""
-        for i in range(self.get_led_count()):
-            self.set_led_color_data(i, r, g, b)
+        self.fill((r, g, b))
 
     def set_all_led_rgb_data(self, color: list) -> None:
         """Set the RGB data of all LEDs."""
-        for i in range(self.get_led_count()):
-            self.set_led_rgb_data(i, color)
+        self.fill(color[:3])
 
     def set_all_led_color(self, r: int, g: int, b: int) -> None:
         """Set the color of all LEDs and update the display."""
-        for i in range(self.get_led_count()):
-            self.set_led_color_data(i, r, g, b)
+        self.fill((r, g, b))
         self.show()
 
     def set_all_led_rgb(self, color: list) -> None:
         """Set the RGB color of all LEDs and update the display."""
-        for i in range(self.get_led_count()):
-            self.set_led_rgb_data(i, color)
+        self.fill(color[:3])
         self.show()
 
-    def show(self) -> None:
-        """Update the LED strip with the current color data."""
-        for i in range(self.get_led_count()):
-            self.strip.setPixelColor(
-                i, Color(self.led_color[i * 3], self.led_color[i * 3 + 1], self.led_color[i * 3 + 2])
-            )
+    def write_frame(self, color: numpy.ndarray, mode=None) -> None:
+        """Send an (N, 3) frame in strip order to the NeoPixel strip."""
+        # Same packing as Color(), done for the whole frame at once
+        c = color.astype(numpy.uint32)
+        packed = (c[:, 0] << 16) | (c[:, 1] << 8) | c[:, 2]
+        for i, value in enumerate(packed.tolist()):
+            self.strip.setPixelColor(i, value)
         self.strip.show()
 
+    def show(self, force: bool = False) -> None:
+        """Update the LED strip with the current color data, unless this exact frame was already sent.
+
+        Writing led_color directly does not bump the version, use force=True then.
+        After enable_async() this is present().
+        """
+        if self.led_async:
+            self.present(force=force)
+            return
+        version = (self.led_version, None)    # Same key as present(), the strip has no encoding modes
+        if not force and version == self.led_sent_version:
+            self.frames_skipped += 1
+            return
+        self.write_frame(self.led_color)
+        self.led_sent_version = version
+        self.frames_sent += 1
+
     def wheel(self, pos: int) -> list:
         """Generate a color wheel value based on the position."""
         if pos < 85:
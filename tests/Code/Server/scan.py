@@ -0,0 +1,75 @@
+import time
+import numpy
+
+# Latest reading stored for every bearing of a ServoScanner
+BEARING_DTYPE = numpy.dtype([('angle', 'f4'), ('distance', 'f4'), ('t', 'f8')])
+
+class SettleModel:
+    """Time between commanding the servo and getting a reading that belongs to the new angle.
+
+    The servo needs base + per_degree * |step| seconds to get there, then
+    the sensor needs sample_time to produce a reading taken after the move,
+    plus the echo round trip 2 * distance / 343 m/s. Without an expected
+    distance the round trip to max_distance is assumed.
+    """
+    SPEED_OF_SOUND = 34300.0              # cm/s
+
+    def __init__(self, base: float = 0.02, per_degree: float = 0.002, sample_time: float = 0.06,
+                 max_distance: float = 300.0):
+        self.base = base                  # s, dead time of the servo
+        self.per_degree = per_degree      # s/degree, about 0.12 s per 60 degrees for an SG90
+        self.sample_time = sample_time    # s, DistanceSensor pings every 60 ms
+        self.max_distance = max_distance  # cm, sensor range
+
+    def echo_time(self, distance: float = None) -> float:
+        if distance is None or numpy.isnan(distance):
+            distance = self.max_distance
+        return 2.0 * min(distance, self.max_distance) / self.SPEED_OF_SOUND
+
+    def __call__(self, step: float, distance: float = None) -> float:
+        return self.base + self.per_degree * abs(step) + self.sample_time + self.echo_time(distance)
+
+class ServoScanner:
+    """Sweeps the sonar servo over a list of angles without blocking.
+
+    poll() is called from the car loop: once the settle model says the
+    reading belongs to the current angle it stores it and commands the next
+    angle at once, so the servo moves while the caller acts on the new
+    bearing. Angles are swept back and forth.
+    """
+    def __init__(self, servo, sonic, angles=range(30, 151, 15), settle=None, channel: str = '0'):
+        self.servo = servo
+        self.sonic = sonic
+        self.settle = settle if settle is not None else SettleModel()
+        self.channel = channel
+        self.bearings = numpy.zeros(len(angles), dtype=BEARING_DTYPE)
+        self.bearings['angle'] = list(angles)
+        self.bearings['distance'] = numpy.nan
+        self.order = list(range(len(angles))) + list(range(len(angles) - 2, 0, -1))  # Ping-pong sweep
+        self.position = 0
+        self.readings = 0
+        self._ready_at = None
+
+    def _move(self, now: float, previous_angle: float) -> None:
+        angle, expected = self.bearings[['angle', 'distance']][self.order[self.position]]
+        self.servo.set_servo_pwm(self.channel, float(angle))
+        step = 180.0 if previous_angle is None else angle - previous_angle   # Unknown start: assume the worst
+        # The last reading at this bearing is the best guess of the echo distance
+        self._ready_at = now + self.settle(step, float(expected))
+
+    def poll(self, now: float = None) -> int:
+        """Take the pending reading if it is due, returns the updated bearing index or None."""
+        if now is None:
+            now = time.monotonic()
+        if self._ready_at is None:
+            self._move(now, None)
+            return None
+        if now < self._ready_at:
+            return None
+        index = self.order[self.position]
+        distance = self.sonic.get_distance()
+        self.bearings[index] = (self.bearings['angle'][index], numpy.nan if distance is None else distance, now)
+        self.readings += 1
+        self.position = (self.position + 1) % len(self.order)
+        self._move(now, self.bearings['angle'][index])
+        return index
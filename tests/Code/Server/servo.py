@@ -1,7 +1,8 @@
 from pca9685 import PCA9685
+from i2c_bus import get_device
 
 class Servo:
-    def __init__(self):
+    def __init__(self, async_mode: bool = False):
         self.pwm_frequency = 50
         self.initial_pulse = 1500
         self.pwm_channel_map = {
@@ -14,10 +15,12 @@ class Servo:
             '6': 14,
             '7': 15
         }
-        self.pwm_servo = PCA9685(0x40, debug=True)
+        self.pwm_servo = get_device(PCA9685, 0x40)    # Same driver object as Ordinary_Car
         self.pwm_servo.set_pwm_freq(self.pwm_frequency)
         for channel in self.pwm_channel_map.values():
             self.pwm_servo.set_servo_pulse(channel, self.initial_pulse)
+        if async_mode:
+            self.pwm_servo.enable_async()
 
     def set_servo_pwm(self, channel: str, angle: int, error: int = 10) -> None:
         angle = int(angle)
@@ -26,6 +29,10 @@ class Servo:
         pulse = 2500 - int((angle + error) / 0.09) if channel == '0' else 500 + int((angle + error) / 0.09)
         self.pwm_servo.set_servo_pulse(self.pwm_channel_map[channel], pulse)
 
+    def close(self) -> None:
+        """Release the PCA9685 shared with the motors."""
+        self.pwm_servo.close()
+
 # Main program logic follows:
 if __name__ == '__main__':
     print("Now servos will rotate to 90 degree.") 
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+# ============================================================================
+# In-process SMBus with PCA9685 and ADS7830 register models
+# ============================================================================
+#
+# Selected with ROVER_I2C_BACKEND=sim (or i2c_bus.set_backend('sim')), it lets
+# Ordinary_Car, Servo, ADC and the Car modes run on a machine without I2C.
+# gpiozero based drivers can run next to it with GPIOZERO_PIN_FACTORY=mock.
+
+Transaction = namedtuple('Transaction', ['timestamp', 'duration', 'thread', 'op', 'address', 'reg', 'data'])
+
+
+class PCA9685Model:
+    """Register file of a PCA9685 as seen from the bus."""
+    MODE1 = 0x00
+    PRESCALE = 0xFE
+    LED0_ON_L = 0x06
+    ALLLED_ON_L = 0xFA
+
+    def __init__(self):
+        self.regs = bytearray(256)
+        self.regs[self.MODE1] = 0x11        # Power-on: SLEEP | ALLCALL
+        self.regs[self.PRESCALE] = 0x1E     # Power-on prescaler (200 Hz)
+
+    def write(self, reg: int, data: list) -> None:
+        auto_increment = self.regs[self.MODE1] & 0x20
+        for value in data:
+            self._write_register(reg, value)
+            if auto_increment:
+                reg = (reg + 1) & 0xFF
+
+    def _write_register(self, reg: int, value: int) -> None:
+        if reg == self.MODE1:
+            value &= 0x7F                   # RESTART reads back as 0 once the oscillator runs
+        elif reg == self.PRESCALE and not self.regs[self.MODE1] & 0x10:
+            return                          # Prescaler is only writable in SLEEP
+        elif self.ALLLED_ON_L <= reg < self.ALLLED_ON_L + 4:
+            offset = reg - self.ALLLED_ON_L
+            for channel in range(16):
+                self.regs[self.LED0_ON_L + 4 * channel + offset] = value
+            return                          # ALL_LED registers read back as 0
+        self.regs[reg] = value
+
+    def read(self, reg: int) -> int:
+        return self.regs[reg]
+
+    def channel(self, channel: int) -> tuple:
+        """(on, off) counts programmed for a channel."""
+        base = self.LED0_ON_L + 4 * channel
+        regs = self.regs
+        return regs[base] | regs[base + 1] << 8, regs[base + 2] | regs[base + 3] << 8
+
+    def frequency(self) -> float:
+        return 25000000.0 / 4096.0 / (self.regs[self.PRESCALE] + 1)
+
+
+class ADS7830Model:
+    """8-channel ADC answering single-ended conversions with preset raw values."""
+
+    def __init__(self, values: list = None):
+        self.values = list(values) if values is not None else [128] * 8
+        # Inverse of the channel selection bits used by ADC.read_adc()
+        self._select = {(((channel << 2) | (channel >> 1)) & 0x07): channel for channel in range(8)}
+        self.channel = 0
+
+    def write(self, reg: int, data: list) -> None:
+        self.channel = self._select[(reg >> 4) & 0x07]
+
+    def read(self, reg: int) -> int:
+        return self.values[self.channel] & 0xFF
+
+
+class SimulatedSMBus:
+    """Drop-in for smbus.SMBus that talks to register models.
+
+    Every transaction sleeps latency + byte_time per byte and is recorded
+    in transactions with its start time, duration and calling thread.
+    """
+
+    def __init__(self, bus_number: int = 1, latency: float = 0.0, byte_time: float = 0.0, log_size: int = 100000):
+        self.bus_number = bus_number
+        self.latency = latency
+        self.byte_time = byte_time
+        self.devices = {0x40: PCA9685Model(), 0x48: ADS7830Model()}
+        self.transactions = deque(maxlen=log_size)
+        self._lock = threading.Lock()
+
+    def _device(self, address: int):
+        device = self.devices.get(address)
+        if device is None:
+            raise OSError(121, "Remote I/O error")
+        return device
+
+    def _transfer(self, op: str, address: int, reg: int, data: list, handler):
+        start = time.perf_counter()
+        with self._lock:
+            delay = self.latency + self.byte_time * (len(data) + 1)
+            if delay > 0:
+                time.sleep(delay)
+            result = handler(self._device(address))
+        self.transactions.append(Transaction(start, time.perf_counter() - start, threading.current_thread().name, op, address, reg, data))
+        return result
+
+    def write_byte(self, address: int, value: int) -> None:
+        self._transfer('write_byte', address, value, [], lambda device: device.write(value, []))
+
+    def read_byte(self, address: int) -> int:
+        return self._transfer('read_byte', address, None, [], lambda device: device.read(None))
+
+    def write_byte_data(self, address: int, reg: int, value: int) -> None:
+        self._transfer('write_byte_data', address, reg, [value], lambda device: device.write(reg, [value]))
+
+    def read_byte_data(self, address: int, reg: int) -> int:
+        return self._transfer('read_byte_data', address, reg, [], lambda device: device.read(reg))
+
+    def write_i2c_block_data(self, address: int, reg: int, data: list) -> None:
+        data = list(data)
+        self._transfer('write_i2c_block_data', address, reg, data, lambda device: device.write(reg, data))
+
+    def read_i2c_block_data(self, address: int, reg: int, length: int) -> list:
+        return self._transfer('read_i2c_block_data', address, reg, [], lambda device: [device.read(reg + i) for i in range(length)])
+
+    def clear_log(self) -> None:
+        self.transactions.clear()
+
+    def close(self) -> None:
+        pass
+
+
+if __name__ == '__main__':
+    # Benchmark: python3 sim_bus.py
+    import i2c_bus
+    from motor import Ordinary_Car
+    i2c_bus.set_backend('sim', latency=0.0002, byte_time=0.00009)   # ~100 kHz bus
+    car = Ordinary_Car()
+    sim = car.pwm.bus.backend
+    sim.clear_log()
+    count = 50
+    start = time.perf_counter()
+    for i in range(count):
+        duty = 1000 if i % 2 else -1000
+        car.set_motor_model(duty, duty, -duty, -duty)
+    elapsed = time.perf_counter() - start
+    print(f"set_motor_model: {elapsed / count * 1000:.2f} ms/call, {len(sim.transactions) / count:.1f} transactions/call")
+    print(f"Channel 1 (on, off): {sim.devices[0x40].channel(1)}, PWM {sim.devices[0x40].frequency():.1f} Hz")
+    car.close()
@@ -1,10 +1,40 @@
 # Import necessary modules
 import spidev
 import numpy
+import time
+from led_transmitter import FrameTransmitter
+
+# SPI bytes for every colour byte value, most significant bit first: 8 per byte in 8-bit mode
+# (0x80 sends a 0, 0xF8 a 1), 4 per byte in 4-bit mode (two bits per SPI byte)
+_BITS8 = (numpy.arange(256)[:, None] >> numpy.arange(7, -1, -1)) & 1
+WS2812_LUT8 = (_BITS8 * 0x78 + 0x80).astype(numpy.uint8)
+_BITS4 = numpy.arange(256)[:, None] >> numpy.arange(6, -1, -2)
+WS2812_LUT4 = (((_BITS4 >> 1) & 1) * 0x60 + (_BITS4 & 1) * 0x06 + 0x88).astype(numpy.uint8)
+
+def spidev_bufsiz(default=4096):
+    """Largest transfer the spidev driver accepts in one ioctl."""
+    try:
+        with open('/sys/module/spidev/parameters/bufsiz') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return default
+
+def encode_ws2812(data, lut, out=None):
+    """SPI bit pattern of the colour bytes in data: one gather from the lookup table into out."""
+    return numpy.take(lut, numpy.asarray(data, dtype=numpy.uint8), axis=0, out=out).reshape(-1)
 
 # Define the Freenove_SPI_LedPixel class
-class Freenove_SPI_LedPixel(object):
+class Freenove_SPI_LedPixel(FrameTransmitter):
+    DEFAULT_MODE = 1    # 8-bit encoding, one SPI byte per colour bit
+
     def __init__(self, count=8, bright=255, sequence='GRB', bus=0, device=0):
+        # Frame version, bumped on every color change; show() skips frames already sent
+        self.led_version = 0
+        self.led_sent_version = None
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        # Double-buffered mode, see enable_async()
+        self.init_transmitter()
         # Initialize LED type
         self.set_led_type(sequence)
         # Set the number of LEDs
@@ -25,6 +55,8 @@ class Freenove_SPI_LedPixel(object):
             self.spi = spidev.SpiDev()
             self.spi.open(self.bus, self.device)
             self.spi.mode = 0
+            self.spi_speed = None                         # Clock of the last transfer, only changed when it differs
+            self.spi_chunk = spidev_bufsiz()
             # Set initialization state to success
             self.led_init_state = 1
         except OSError:
@@ -62,14 +94,19 @@ class Freenove_SPI_LedPixel(object):
     def led_close(self):
         # Turn off all LEDs and close the SPI connection
         self.set_all_led_rgb([0, 0, 0])
+        self.stop_transmitter()
         self.spi.close()
     
     def set_led_count(self, count):
         # Set the number of LEDs
         self.led_count = count
-        # Initialize the color arrays
-        self.led_color = [0, 0, 0] * self.led_count
-        self.led_original_color = [0, 0, 0] * self.led_count
+        self.led_version += 1
+        # Initialize the color arrays: colors as given (R, G, B) and as sent (strip order, brightness applied)
+        self.led_original_color = numpy.zeros((self.led_count, 3), dtype=numpy.uint8)
+        self.led_color = numpy.zeros((self.led_count, 3), dtype=numpy.uint8)
+        # Encoded frames are gathered into these buffers instead of being allocated on every show()
+        self.led_tx8 = numpy.empty((self.led_count * 3, 8), dtype=numpy.uint8)
+        self.led_tx4 = numpy.empty((self.led_count * 3, 4), dtype=numpy.uint8)
     
     def get_led_count(self):
         # Return the number of LEDs
@@ -84,30 +121,57 @@ class Freenove_SPI_LedPixel(object):
             self.led_red_offset = (led_type_offset[index] >> 4) & 0x03
             self.led_green_offset = (led_type_offset[index] >> 2) & 0x03
             self.led_blue_offset = (led_type_offset[index] >> 0) & 0x03
-            return index
         except ValueError:
             self.led_red_offset = 1
             self.led_green_offset = 0
             self.led_blue_offset = 2
-            return -1
+            index = -1
+        # Permutation index: strip channel k carries color channel led_order[k]
+        self.led_order = numpy.zeros(3, dtype=numpy.intp)
+        self.led_order[[self.led_red_offset, self.led_green_offset, self.led_blue_offset]] = [0, 1, 2]
+        if hasattr(self, 'led_color'):
+            self.update_led_color()
+        return index
     
     def set_led_brightness(self, brightness):
-        # Set the brightness of all LEDs
+        # Set the brightness of all LEDs: one scale table for every byte value, applied to the whole frame
         self.led_brightness = brightness
-        for i in range(self.get_led_count()):
-            self.set_led_rgb_data(i, self.led_original_color)
-            
+        self.led_scale = numpy.round(numpy.arange(256) * brightness / 255).astype(numpy.uint8)
+        self.update_led_color()
+
+    def update_led_color(self, rows=slice(None)):
+        # Rebuild the sent colors of the given LEDs (index, slice or index array) with one gather
+        color = self.led_scale[self.led_original_color[rows][..., self.led_order]]
+        if not numpy.array_equal(color, self.led_color[rows]):
+            self.led_color[rows] = color
+            self.led_version += 1
+
     def set_ledpixel(self, index, r, g, b):
         # Set the color of a specific LED
-        p = [0, 0, 0]
-        p[self.led_red_offset] = round(r * self.led_brightness / 255)
-        p[self.led_green_offset] = round(g * self.led_brightness / 255)
-        p[self.led_blue_offset] = round(b * self.led_brightness / 255)
-        self.led_original_color[index * 3 + self.led_red_offset] = r
-        self.led_original_color[index * 3 + self.led_green_offset] = g
-        self.led_original_color[index * 3 + self.led_blue_offset] = b
-        for i in range(3):
-            self.led_color[index * 3 + i] = p[i]
+        self.led_original_color[index] = (r, g, b)
+        self.update_led_color(index)
+
+    def set_frame(self, frame):
+        # Set every LED from an (N, 3) array-like of R, G, B values
+        self.led_original_color[:] = frame
+        self.update_led_color()
+
+    def fill(self, color):
+        # Set every LED to the same [R, G, B] color
+        self.led_original_color[:] = color
+        self.update_led_color()
+
+    def __len__(self):
+        return self.led_count
+
+    def __getitem__(self, key):
+        # strip[i] or strip[a:b]: colors as given, R, G, B
+        return self.led_original_color[key]
+
+    def __setitem__(self, key, color):
+        # strip[a:b] = color or (M, 3) colors, shown on the next show()
+        self.led_original_color[key] = color
+        self.update_led_color(key)
 
     def set_led_color_data(self, index, r, g, b):
         # Set the color data of a specific LED
@@ -129,57 +193,79 @@ class Freenove_SPI_LedPixel(object):
     
     def set_all_led_color_data(self, r, g, b):
         # Set the color data of all LEDs
-        for i in range(self.get_led_count()):
-            self.set_led_color_data(i, r, g, b)
+        self.fill((r, g, b))
             
     def set_all_led_rgb_data(self, color):
         # Set the RGB data of all LEDs
-        for i in range(self.get_led_count()):
-            self.set_led_rgb_data(i, color)   
+        self.fill(color[:3])
         
     def set_all_led_color(self, r, g, b):
         # Set the color of all LEDs and update the display
-        for i in range(self.get_led_count()):
-            self.set_led_color_data(i, r, g, b)
+        self.fill((r, g, b))
         self.show()
         
     def set_all_led_rgb(self, color):
         # Set the RGB color of all LEDs and update the display
-        for i in range(self.get_led_count()):
-            self.set_led_rgb_data(i, color) 
+        self.fill(color[:3])
         self.show()
     
-    def write_ws2812_numpy8(self):
-        # Convert the color data to a format suitable for WS2812 LEDs
-        d = numpy.array(self.led_color).ravel()        # Convert data into a one-dimensional array
-        tx = numpy.zeros(len(d) * 8, dtype=numpy.uint8)  # Each RGB color has 8 bits, each represented by a uint8 type data
-        for ibit in range(8):                          # Convert each bit of data to the data that the SPI will send
-            tx[7 - ibit::8] = ((d >> ibit) & 1) * 0x78 + 0x80   # T0H=1,T0L=7, T1H=5,T1L=3   #0b11111000 mean T1(0.78125us), 0b10000000 mean T0(0.15625us)  
+    def write_ws2812_numpy8(self, color=None):
+        # Convert the color data (default: led_color) to a format suitable for WS2812 LEDs: each bit becomes one SPI byte
+        # T0H=1,T0L=7, T1H=5,T1L=3   #0b11111000 mean T1(0.78125us), 0b10000000 mean T0(0.15625us)
+        color = (self.led_color if color is None else color).reshape(-1)
+        tx = encode_ws2812(color, WS2812_LUT8, self.led_tx8 if len(self.led_tx8) == len(color) else None)
         if self.led_init_state != 0:
             if self.bus == 0:
-                self.spi.xfer(tx.tolist(), int(8 / 1.25e-6))         # Send color data at a frequency of 6.4Mhz
+                self.spi_write(tx, int(8 / 1.25e-6))         # Send color data at a frequency of 6.4Mhz
             else:
-                self.spi.xfer(tx.tolist(), int(8 / 1.0e-6))          # Send color data at a frequency of 8Mhz
+                self.spi_write(tx, int(8 / 1.0e-6))          # Send color data at a frequency of 8Mhz
         
-    def write_ws2812_numpy4(self):
-        # Convert the color data to a format suitable for WS2812 LEDs (4-bit mode)
-        d = numpy.array(self.led_color).ravel()
-        tx = numpy.zeros(len(d) * 4, dtype=numpy.uint8)
-        for ibit in range(4):
-            tx[3 - ibit::4] = ((d >> (2 * ibit + 1)) & 1) * 0x60 + ((d >> (2 * ibit + 0)) & 1) * 0x06 + 0x88  
+    def write_ws2812_numpy4(self, color=None):
+        # Convert the color data to a format suitable for WS2812 LEDs (4-bit mode): two bits per SPI byte
+        color = (self.led_color if color is None else color).reshape(-1)
+        tx = encode_ws2812(color, WS2812_LUT4, self.led_tx4 if len(self.led_tx4) == len(color) else None)
         if self.led_init_state != 0:
             if self.bus == 0:
-                self.spi.xfer(tx.tolist(), int(4 / 1.25e-6))         
+                self.spi_write(tx, int(4 / 1.25e-6))         
             else:
-                self.spi.xfer(tx.tolist(), int(4 / 1.0e-6))       
+                self.spi_write(tx, int(4 / 1.0e-6))       
+
+    def spi_write(self, tx, speed_hz=None):
+        # Send a bytes-like frame (bytes, bytearray or uint8 array) without turning it into a list of ints.
+        # Frames longer than the spidev buffer go in consecutive chunks; the gap between them is far
+        # shorter than the WS2812 latch time, so the strip still sees one frame.
+        if speed_hz is not None and speed_hz != self.spi_speed:
+            self.spi.max_speed_hz = speed_hz
+            self.spi_speed = speed_hz
+        view = memoryview(tx).cast('B')
+        if hasattr(self.spi, 'writebytes2'):
+            for start in range(0, len(view), self.spi_chunk):
+                self.spi.writebytes2(view[start:start + self.spi_chunk])
+        else:
+            # spidev older than 3.5 only takes lists
+            for start in range(0, len(view), self.spi_chunk):
+                self.spi.xfer(view[start:start + self.spi_chunk].tolist(), self.spi_speed or 0)
         
-    def show(self, mode=1):
-        # Update the display with the current color data
+    def write_frame(self, color, mode=DEFAULT_MODE):
+        # Encode and send one (N, 3) frame, called by show() and by the transmitter thread
         if mode == 1:
-            write_ws2812 = self.write_ws2812_numpy8
+            self.write_ws2812_numpy8(color)
         else:
-            write_ws2812 = self.write_ws2812_numpy4
-        write_ws2812()
+            self.write_ws2812_numpy4(color)
+
+    def show(self, mode=DEFAULT_MODE, force=False):
+        # Update the display with the current color data, unless this exact frame was already sent.
+        # Writing led_color directly does not bump the version: call show(force=True) then
+        if self.led_async:
+            self.present(mode, force)
+            return
+        version = (self.led_version, mode)
+        if not force and version == self.led_sent_version:
+            self.frames_skipped += 1
+            return
+        self.write_frame(self.led_color, mode)
+        self.led_sent_version = version
+        self.frames_sent += 1
         
     def wheel(self, pos):
         # Generate a color based on the position in the color wheel
@@ -226,9 +312,46 @@ class Freenove_SPI_LedPixel(object):
             b = rgb_max - rgb_adj
         return [r, g, b]
     
+def _encode_shift8(data):
+    # Encoder used before the lookup tables, kept as the benchmark reference
+    d = numpy.array(data).ravel()
+    tx = numpy.zeros(len(d) * 8, dtype=numpy.uint8)
+    for ibit in range(8):
+        tx[7 - ibit::8] = ((d >> ibit) & 1) * 0x78 + 0x80
+    return tx
+
+def _encode_shift4(data):
+    d = numpy.array(data).ravel()
+    tx = numpy.zeros(len(d) * 4, dtype=numpy.uint8)
+    for ibit in range(4):
+        tx[3 - ibit::4] = ((d >> (2 * ibit + 1)) & 1) * 0x60 + ((d >> (2 * ibit + 0)) & 1) * 0x06 + 0x88
+    return tx
+
+def benchmark_encoders(counts=(8, 144, 1000), repeat=2000):
+    # Time per frame of the shift/mask encoders against the lookup table gather, no SPI needed
+    rng = numpy.random.default_rng(0)
+    for count in counts:
+        colors = rng.integers(0, 256, count * 3).tolist()
+        out8 = numpy.empty((count * 3, 8), dtype=numpy.uint8)
+        out4 = numpy.empty((count * 3, 4), dtype=numpy.uint8)
+        assert numpy.array_equal(encode_ws2812(colors, WS2812_LUT8, out8), _encode_shift8(colors))
+        assert numpy.array_equal(encode_ws2812(colors, WS2812_LUT4, out4), _encode_shift4(colors))
+        n = max(10, repeat * 8 // count)
+        for name, encode in (("shift 8-bit", lambda: _encode_shift8(colors)),
+                             ("table 8-bit", lambda: encode_ws2812(colors, WS2812_LUT8, out8)),
+                             ("shift 4-bit", lambda: _encode_shift4(colors)),
+                             ("table 4-bit", lambda: encode_ws2812(colors, WS2812_LUT4, out4))):
+            start = time.perf_counter()
+            for _ in range(n):
+                encode()
+            print("{:5d} LEDs  {}: {:8.1f} us/frame".format(count, name, (time.perf_counter() - start) / n * 1e6))
+
 if __name__ == '__main__':
-    import time
     import os
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark_encoders()
+        sys.exit()
     # Print the version of the spidev module
     print("spidev version is ", spidev.__version__)
     # Print the available SPI devices
@@ -3,14 +3,15 @@ import warnings
 import time
 
 class Ultrasonic:
-    def __init__(self, trigger_pin: int = 27, echo_pin: int = 22, max_distance: float = 3.0):
+    def __init__(self, trigger_pin: int = 27, echo_pin: int = 22, max_distance: float = 3.0, queue_len: int = 9):
         # Initialize the Ultrasonic class and set up the distance sensor.
         warnings.filterwarnings("ignore", category = DistanceSensorNoEcho)
         warnings.filterwarnings("ignore", category = PWMSoftwareFallback)  # Ignore PWM software fallback warnings
         self.trigger_pin = trigger_pin  # Set the trigger pin number
         self.echo_pin = echo_pin        # Set the echo pin number
         self.max_distance = max_distance  # Set the maximum distance
-        self.sensor = DistanceSensor(echo=self.echo_pin, trigger=self.trigger_pin, max_distance=self.max_distance)  # Initialize the distance sensor
+        self.queue_len = queue_len        # Readings in the median, one every 60 ms
+        self.sensor = DistanceSensor(echo=self.echo_pin, trigger=self.trigger_pin, max_distance=self.max_distance, queue_len=self.queue_len)  # Initialize the distance sensor
 
     def __enter__(self):
         return self
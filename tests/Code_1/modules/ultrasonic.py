@@ -1,24 +1,86 @@
 import RPi.GPIO as GPIO
+import threading
 import time
 
 class SensorUltrasonico:
-    def __init__(self, trig=16, echo=18):
+    def __init__(self, trig=16, echo=18, usar_eventos=True):
         self.trig = trig
         self.echo = echo
         # Criterio: Sensórica - Configuración obligatoria
         GPIO.setup(self.trig, GPIO.OUT)
         GPIO.setup(self.echo, GPIO.IN)
 
-    def obtener_distancia(self):
+        # Medición por flancos: el hilo de RPi.GPIO marca la subida y la bajada del eco,
+        # nosotros esperamos en un Event sin ocupar la CPU
+        self.eco_recibido = threading.Event()
+        self.t_subida = None
+        self.t_bajada = None
+        self.armado = False  # Solo cuentan los flancos posteriores a nuestro disparo
+        self.usar_eventos = usar_eventos
+        if self.usar_eventos:
+            try:
+                GPIO.add_event_detect(self.echo, GPIO.BOTH, callback=self._flanco_eco)
+            except RuntimeError:
+                # Pin ya usado por otra detección: se vuelve al sondeo clásico
+                self.usar_eventos = False
+
+    def _flanco_eco(self, canal):
+        # Primero el tiempo, lo más cerca posible del flanco. El nivel no se lee: con ecos
+        # cortos (< 10 cm) el pin ya puede estar bajo cuando corre el callback.
+        # Tras el disparo, el primer flanco es la subida y el segundo la bajada
+        t = time.perf_counter()
+        if not self.armado:
+            return
+        if self.t_subida is None:
+            self.t_subida = t
+        elif self.t_bajada is None:
+            self.t_bajada = t
+            self.armado = False
+            self.eco_recibido.set()
+
+    def _limpiar_trigger(self):
         # Limpieza del pin trigger
         GPIO.output(self.trig, False)
         time.sleep(0.01)
 
+    def _disparar(self):
+        self._limpiar_trigger()
+        self._pulso()
+
+    def _pulso(self):
         # Disparo de pulso (10 microsegundos)
         GPIO.output(self.trig, True)
         time.sleep(0.00001)
         GPIO.output(self.trig, False)
 
+    def obtener_distancia(self):
+        if self.usar_eventos:
+            return self._distancia_eventos()
+        return self._distancia_sondeo()
+
+    def _distancia_eventos(self):
+        self.armado = False
+        self._limpiar_trigger()
+        # Se arma justo antes del pulso: los flancos de la limpieza no cuentan
+        self.t_subida = None
+        self.t_bajada = None
+        self.eco_recibido.clear()
+        self.armado = True
+        self._pulso()
+
+        # Mismos límites que el sondeo: 0.1 s para el inicio del eco + 0.1 s para el final
+        if not self.eco_recibido.wait(0.2):
+            self.armado = False
+            return 100.0  # Si falla, devolvemos una distancia segura
+
+        duracion = self.t_bajada - self.t_subida
+        distancia = (duracion * 34300) / 2
+
+        return round(distancia, 2)
+
+    def _distancia_sondeo(self):
+        self._disparar()
+
         # Tiempos de seguridad para evitar bloqueos
         timeout = time.time() + 0.1
         start_time = time.time()
@@ -39,5 +101,34 @@ class SensorUltrasonico:
 
         duracion = stop_time - start_time
         distancia = (duracion * 34300) / 2
-        
+
         return round(distancia, 2)
+
+    def cerrar(self):
+        if self.usar_eventos:
+            GPIO.remove_event_detect(self.echo)
+
+
+def benchmark(sensor, modo, n=50):
+    """Tiempo de CPU del proceso por medición (incluye el hilo de callbacks de RPi.GPIO)."""
+    medir = sensor._distancia_eventos if modo == "eventos" else sensor._distancia_sondeo
+    cpu = time.process_time()
+    real = time.perf_counter()
+    for _ in range(n):
+        medir()
+    cpu = (time.process_time() - cpu) / n
+    real = (time.perf_counter() - real) / n
+    print(f"{modo:8s}: CPU {cpu * 1000:.3f} ms/medición, tiempo real {real * 1000:.3f} ms/medición")
+
+
+if __name__ == "__main__":
+    # Modo benchmark: compara el sondeo activo con la detección por flancos
+    GPIO.setmode(GPIO.BOARD)
+    sensor = SensorUltrasonico(16, 18)
+    try:
+        benchmark(sensor, "sondeo")
+        if sensor.usar_eventos:
+            benchmark(sensor, "eventos")
+    finally:
+        sensor.cerrar()
+        GPIO.cleanup()